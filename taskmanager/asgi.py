@@ -3,3 +3,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taskmanager.settings')
 application = get_asgi_application()
+
+from tasks.aio import asgi_application  # noqa: E402 - после настройки Django
+
+application = asgi_application(application)
@@ -1,5 +1,5 @@
+import os
 from pathlib import Path
-import mongoengine
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -7,11 +7,37 @@ SECRET_KEY = 'django-insecure-6^5x@w@_3#x2hzft6ynd1a0i9daeh%&ychh)#p_galpzaguf%o
 DEBUG = True
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 
-mongoengine.connect(
-    db='taskmanager_db',
-    host='localhost',
-    port=27017,
-)
+def env_int(name, default=None):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+# Подключение регистрируется в TasksConfig.ready() и открывается при первом запросе.
+# Каждый параметр можно переопределить переменной окружения MONGODB_<КЛЮЧ>.
+MONGODB = {
+    'NAME': os.environ.get('MONGODB_NAME', 'taskmanager_db'),
+    'URI': os.environ.get('MONGODB_URI', 'mongodb://localhost:27017'),
+    'MAX_POOL_SIZE': env_int('MONGODB_MAX_POOL_SIZE', 100),
+    'MIN_POOL_SIZE': env_int('MONGODB_MIN_POOL_SIZE', 0),
+    'MAX_IDLE_TIME_MS': env_int('MONGODB_MAX_IDLE_TIME_MS'),
+    'WAIT_QUEUE_TIMEOUT_MS': env_int('MONGODB_WAIT_QUEUE_TIMEOUT_MS'),
+    'CONNECT_TIMEOUT_MS': env_int('MONGODB_CONNECT_TIMEOUT_MS', 5000),
+    'SERVER_SELECTION_TIMEOUT_MS': env_int('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000),
+    'SOCKET_TIMEOUT_MS': env_int('MONGODB_SOCKET_TIMEOUT_MS'),
+    'READ_PREFERENCE': os.environ.get('MONGODB_READ_PREFERENCE', 'primary'),
+    # Доска, поиск, автодополнение и статистика читают с реплик с этим режимом;
+    # 'primary' отключает маршрутизацию. 90 секунд — минимум maxStalenessSeconds.
+    'REPLICA_READ_PREFERENCE': os.environ.get('MONGODB_REPLICA_READ_PREFERENCE', 'secondaryPreferred'),
+    'MAX_STALENESS_SECONDS': env_int('MONGODB_MAX_STALENESS_SECONDS', 90),
+    # Сколько секунд после своей записи пользователь читает только с primary
+    # (по умолчанию равно MAX_STALENESS_SECONDS).
+    'RECENT_WRITE_SECONDS': env_int('MONGODB_RECENT_WRITE_SECONDS'),
+    # Например 'zstd,snappy,zlib'; zstd и snappy требуют пакетов zstandard и python-snappy.
+    'COMPRESSORS': os.environ.get('MONGODB_COMPRESSORS', ''),
+    # Асинхронные представления используют AsyncMongoClient (PyMongo >= 4.10) или Motor,
+    # если они установлены; иначе запросы выполняются синхронным драйвером в пуле потоков.
+    'ASYNC': os.environ.get('MONGODB_ASYNC', '1') != '0',
+}
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -24,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tasks.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -32,13 +59,15 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'tasks.middleware.SecurityMiddleware',
+    'tasks.middleware.UserIdentityMapMiddleware',
+    'tasks.middleware.RecentWriteMiddleware',
 ]
 
 ROOT_URLCONF = 'taskmanager.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'tasks.instrumentation.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -57,9 +86,65 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение переиспользуется между запросами; WAL позволяет воркерам читать,
+        # пока другой воркер пишет, а IMMEDIATE сразу берёт блокировку записи.
+        'CONN_MAX_AGE': env_int('DJANGO_CONN_MAX_AGE', 600),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Сессии читаются из кэша и пишутся в БД только при изменении. Без общего кэша
+# (Redis, Memcached) можно хранить сессию в подписанной cookie:
+# DJANGO_SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies
+SESSION_ENGINE = os.environ.get('DJANGO_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
+AUTHENTICATION_BACKENDS = ['tasks.auth.CachedModelBackend']
+
+# Живое обновление доски (/api/tasks/events/): поток изменений MongoDB или опрос
+# по updated_at раз в POLL_INTERVAL секунд, если сервер не входит в набор реплик.
+TASK_LIVE_UPDATES = {
+    'CHANGE_STREAMS': os.environ.get('TASK_LIVE_CHANGE_STREAMS', '1') != '0',
+    'POLL_INTERVAL': 2.0,
+    'HEARTBEAT_INTERVAL': 15.0,
+    'QUEUE_SIZE': 100,
+    # MongoDB 6.0+ и collMod tasks changeStreamPreAndPostImages: {enabled: true}.
+    'PRE_IMAGES': os.environ.get('TASK_LIVE_PRE_IMAGES', '0') == '1',
+    'TRACKED_TASKS': 100000,
+    # Под WSGI каждая открытая вкладка занимает рабочий поток, поэтому поток событий
+    # по умолчанию отдаётся только под ASGI (taskmanager.asgi).
+    'WSGI_STREAMS': os.environ.get('TASK_LIVE_WSGI_STREAMS', '0') == '1',
+}
+
+# Напоминания о сроках (python manage.py run_scheduler): «скоро срок» за LEAD_TIME секунд,
+# «просрочено» в момент срока; все интервалы в секундах.
+TASK_SCHEDULER = {
+    'LEAD_TIME': int(os.environ.get('TASK_REMINDER_LEAD_TIME', '3600')),
+    'HORIZON': 6 * 3600,
+    'CATCH_UP': 24 * 3600,
+    'POLL_INTERVAL': 30.0,
+    'BATCH_SIZE': 500,
+}
+
+# Перенос выполненных задач в коллекцию tasks_archive (python manage.py archive_tasks):
+# задачи со статусом «Готово», не менявшиеся AFTER_DAYS дней, переносятся пачками.
+TASK_ARCHIVE = {
+    'AFTER_DAYS': int(os.environ.get('TASK_ARCHIVE_AFTER_DAYS', '30')),
+    'BATCH_SIZE': 500,
+    'PAUSE': 0.1,
+}
+
+TASK_USER_CACHE = {
+    'MAX_USERS': 10000,
+    'TTL': 60,
+    # Пароль и is_active сверяются с базой не реже раза в AUTH_TTL секунд.
+    'AUTH_TTL': 5,
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -91,6 +176,52 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'task_list'
 LOGOUT_REDIRECT_URL = 'login'
 
+TASK_AUTOCOMPLETE_CACHE = {
+    'MAX_USERS': 1000,
+    'MAX_TASKS': 5000,
+    'MAX_TERMS': 100000,
+    'MAX_TOTAL_TERMS': 2000000,
+    'TTL': 60,
+}
+
+TASK_STATS_CACHE_TTL = 60
+
+TASK_BOARD_CACHE_TTL = 300
+
+# Объединение одинаковых одновременных запросов к MongoDB (автодополнение, доска,
+# статистика); WINDOW — сколько секунд готовый ответ раздаётся повторным запросам.
+TASK_SINGLE_FLIGHT = {
+    'ENABLED': os.environ.get('TASK_SINGLE_FLIGHT', '1') != '0',
+    'WINDOW': float(os.environ.get('TASK_SINGLE_FLIGHT_WINDOW', '0.3')),
+}
+
+METRICS_TOKEN = None
+
+# Замер времени запросов (MongoDB, SQL, шаблоны): доля замеряемых запросов,
+# заголовок Server-Timing и JSON-записи в журнал tasks.requests.
+TASK_REQUEST_TIMING = {
+    'SAMPLE_RATE': float(os.environ.get('TASK_REQUEST_TIMING_SAMPLE_RATE', '1.0')),
+    'SERVER_TIMING': os.environ.get('TASK_REQUEST_SERVER_TIMING', '1') != '0',
+    'LOG': os.environ.get('TASK_REQUEST_TIMING_LOG', '1') != '0',
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'tasks.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('TASK_REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
@@ -0,0 +1,126 @@
+import asyncio
+import inspect
+import itertools
+import weakref
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .connection import client_options, pool_metrics
+from .routing import current_read_preference
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:  # PyMongo < 4.10
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient as AsyncMongoClient
+    except ImportError:
+        AsyncMongoClient = None
+
+
+# Асинхронный клиент привязан к циклу событий, поэтому на каждый цикл свой.
+_clients = weakref.WeakKeyDictionary()
+# Номер клиента в метриках пула: клиенты разных циклов не делят статистику.
+_client_numbers = itertools.count(1)
+# Под WSGI async_to_sync создаёт новый цикл на каждый запрос, и клиент на цикл означал бы
+# новый пул соединений на каждый запрос. Поэтому асинхронный драйвер включается только
+# для запросов, пришедших через asgi_application, где цикл живёт всё время процесса.
+_serving_asgi = ContextVar('tasks_serving_asgi', default=False)
+
+
+def async_driver_enabled():
+    return AsyncMongoClient is not None and settings.MONGODB.get('ASYNC', True) and _serving_asgi.get()
+
+
+def async_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        listener = pool_metrics.for_client(f'async-{next(_client_numbers)}')
+        client = AsyncMongoClient(settings.MONGODB['URI'], event_listeners=[listener], **client_options())
+        _clients[loop] = client
+    return client
+
+
+async def close_clients():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        result = client.close()
+        if inspect.isawaitable(result):  # close() корутина у PyMongo и обычный метод у Motor
+            await result
+
+
+def asgi_application(application):
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await lifespan(receive, send)
+            return
+        token = _serving_asgi.set(True)
+        try:
+            await application(scope, receive, send)
+        finally:
+            _serving_asgi.reset(token)
+    return app
+
+
+async def lifespan(receive, send):
+    # Django не обрабатывает lifespan; при остановке сервера клиент цикла закрывается.
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_clients()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def async_collection(document):
+    return async_client()[settings.MONGODB['NAME']][document._get_collection_name()]
+
+
+def with_read_preference(collection, preference):
+    return collection if preference is None else collection.with_options(read_preference=preference)
+
+
+def queryset_find_args(queryset):
+    # Те же фильтр, проекция, сортировка и лимит, что выполнил бы сам QuerySet.
+    ordering = queryset._ordering
+    if ordering is None:
+        ordering = queryset._get_order_by(queryset._document._meta['ordering'])
+    projection = queryset._loaded_fields.as_dict() if queryset._loaded_fields else None
+    return {
+        'filter': queryset._query,
+        'projection': projection,
+        'sort': ordering or None,
+        'limit': queryset._limit or 0,
+    }
+
+
+async def fetch(queryset):
+    # Документы QuerySet в виде словарей (как as_pymongo()) без блокировки цикла событий.
+    if queryset._none:
+        return []
+
+    kwargs = queryset_find_args(queryset)
+    preference = queryset._read_preference
+    if not async_driver_enabled():
+        collection = with_read_preference(queryset._document._get_collection(), preference)
+        return await sync_to_async(lambda: list(collection.find(**kwargs)), thread_sensitive=False)()
+
+    cursor = with_read_preference(async_collection(queryset._document), preference).find(**kwargs)
+    return await cursor.to_list(None)
+
+
+async def aggregate(document, pipeline):
+    preference = current_read_preference()
+    if not async_driver_enabled():
+        collection = with_read_preference(document._get_collection(), preference)
+        return await sync_to_async(lambda: list(collection.aggregate(pipeline)), thread_sensitive=False)()
+
+    # PyMongo возвращает курсор из корутины, Motor — сразу.
+    cursor = with_read_preference(async_collection(document), preference).aggregate(pipeline)
+    if inspect.isawaitable(cursor):
+        cursor = await cursor
+    return await cursor.to_list(None)
@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    name = 'tasks'
+
+    def ready(self):
+        from pymongo import monitoring
+        from . import auth, autocomplete, fragments, singleflight  # noqa: F401 - подключают обработчики сигналов
+        from .connection import register_connection
+        from .instrumentation import command_timer
+
+        # Слушатель команд регистрируется до создания первого клиента; слушатели пулов
+        # передаются каждому клиенту отдельно (connection.PoolMetrics.for_client).
+        monitoring.register(command_timer)
+        register_connection()
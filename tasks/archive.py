@@ -0,0 +1,74 @@
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from pymongo import ReplaceOne
+
+from .models import ARCHIVABLE_FILTER, ArchivedTask, Task
+from .signals import task_changed
+
+
+ARCHIVE_CONFIG = getattr(settings, 'TASK_ARCHIVE', {})
+# Через сколько дней после последнего изменения выполненная задача уходит в архив.
+AFTER_DAYS = ARCHIVE_CONFIG.get('AFTER_DAYS', 30)
+BATCH_SIZE = ARCHIVE_CONFIG.get('BATCH_SIZE', 500)
+# Пауза между пачками, секунд: перенос не должен вытеснять запросы доски.
+PAUSE = ARCHIVE_CONFIG.get('PAUSE', 0.1)
+
+
+def archivable_queryset(cutoff):
+    # Условия ARCHIVABLE_FILTER повторяются дословно: запрос идёт по частичному индексу
+    # (status, updated_at), в котором только выполненные задачи.
+    query = dict(ARCHIVABLE_FILTER, updated_at={'$lt': cutoff})
+    return Task.objects(__raw__=query).order_by('updated_at')
+
+
+def archive_batch(cutoff, batch_size=BATCH_SIZE, now=None):
+    now = now or datetime.now()
+    docs = list(archivable_queryset(cutoff).limit(batch_size).as_pymongo())
+    if not docs:
+        return 0, 0
+
+    # Замена по _id: после прерванного прохода копия в архиве просто перезаписывается.
+    ArchivedTask._get_collection().bulk_write(
+        [ReplaceOne({'_id': doc['_id']}, dict(doc, archived_at=now), upsert=True) for doc in docs],
+        ordered=False,
+    )
+    ids = [doc['_id'] for doc in docs]
+    tasks = Task._get_collection()
+    # Задача, удалённая владельцем до записи копии, уже отсутствует в tasks; удалённую
+    # после записи копии убирает из архива сам delete_task (drop_archive_copies).
+    gone = set(ids) - {doc['_id'] for doc in tasks.find({'_id': {'$in': ids}}, {'_id': 1})}
+    moved = tasks.delete_many(dict(ARCHIVABLE_FILTER, _id={'$in': ids}, updated_at={'$lt': cutoff})).deleted_count
+    # Задачу вернули в работу между чтением и удалением: она остаётся только в tasks.
+    kept = set()
+    if moved < len(ids) - len(gone):
+        kept = {doc['_id'] for doc in tasks.find({'_id': {'$in': ids}}, {'_id': 1})}
+    skipped = gone | kept
+    if skipped:
+        ArchivedTask._get_collection().delete_many({'_id': {'$in': list(skipped)}})
+
+    # task_changed увеличивает версию доски в MongoDB (fragments.bump_board_version):
+    # веб-процессы сверяют с ней ETag и кэш статистики, а не ждут сигнала из этого процесса.
+    for user_id in {doc['user_id'] for doc in docs}:
+        task_changed.send(sender=Task, user_id=user_id)
+    return len(docs), moved
+
+
+def drop_archive_copies(ids, user_id):
+    # Удаление задачи владельцем убирает и её копию, которую перенос мог записать в архив.
+    ArchivedTask._get_collection().delete_many({'_id': {'$in': list(ids)}, 'user_id': user_id})
+
+
+def archive_tasks(after_days=AFTER_DAYS, batch_size=BATCH_SIZE, pause=PAUSE, limit=None, clock=datetime.now):
+    cutoff = clock() - timedelta(days=after_days)
+    total = 0
+    while limit is None or total < limit:
+        size = batch_size if limit is None else min(batch_size, limit - total)
+        read, moved = archive_batch(cutoff, size, clock())
+        total += moved
+        if read < size:
+            break
+        if pause:
+            time.sleep(pause)
+    return total
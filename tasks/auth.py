@@ -0,0 +1,156 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import metrics
+
+
+# Поля, от которых зависит действительность сессии: хэш сессии строится из пароля.
+AUTH_FIELDS = ('password', 'is_active')
+
+
+def auth_state(user):
+    return tuple(getattr(user, field) for field in AUTH_FIELDS)
+
+
+class UserCache:
+    # Пользователи по id в памяти процесса: запросы с сессией не обращаются к auth_user.
+    # Сигнал об изменении пользователя виден только в своём процессе, поэтому пароль
+    # и is_active сверяются с базой не реже раза в auth_ttl секунд (запрос двух полей).
+    def __init__(self, max_users=10000, ttl=60, auth_ttl=5, clock=time.monotonic):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.auth_ttl = auth_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.auth_checks = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and self.clock() - entry[1] > self.ttl:
+                del self._entries[user_id]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None, self._writes
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+        # Каждый запрос получает свою копию: request.user можно изменять.
+        return copy.copy(entry[0]), None
+
+    def put(self, user_id, user, writes):
+        with self._lock:
+            # Пока пользователь загружался, его могли изменить: такую копию не сохраняем.
+            if writes != self._writes:
+                return
+            now = self.clock()
+            # (пользователь, время загрузки, время последней сверки пароля и is_active)
+            self._entries[user_id] = (copy.copy(user), now, now)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def auth_check_due(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry is not None and self.clock() - entry[2] > self.auth_ttl
+
+    def auth_checked(self, user_id, current):
+        # current — (password, is_active) из базы или None, если пользователя удалили.
+        # Возвращает False, если запись устарела и удалена из кэша.
+        with self._lock:
+            self.auth_checks += 1
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return False
+            if current == auth_state(entry[0]):
+                self._entries[user_id] = (entry[0], entry[1], self.clock())
+                return True
+        self.invalidate(user_id)
+        return False
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._writes += 1
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            users = len(self._entries)
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'auth_checks': self.auth_checks,
+            'users': users,
+        }
+
+
+user_cache = UserCache(**{
+    key.lower(): value for key, value in getattr(settings, 'TASK_USER_CACHE', {}).items()
+})
+
+
+def auth_state_queryset(user_id):
+    return get_user_model()._default_manager.filter(pk=user_id).values_list(*AUTH_FIELDS)
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        user, writes = user_cache.get(user_id)
+        if user is not None and user_cache.auth_check_due(user_id):
+            if not user_cache.auth_checked(user_id, auth_state_queryset(user_id).first()):
+                user, writes = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                user_cache.put(user_id, user, writes)
+        return user
+
+    async def aget_user(self, user_id):
+        user, writes = user_cache.get(user_id)
+        if user is not None and user_cache.auth_check_due(user_id):
+            if not user_cache.auth_checked(user_id, await auth_state_queryset(user_id).afirst()):
+                user, writes = user_cache.get(user_id)
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                user_cache.put(user_id, user, writes)
+        return user
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user(sender, instance, **kwargs):
+    # Смена пароля или is_active видна сразу в этом процессе и через auth_ttl — в остальных.
+    user_cache.invalidate(instance.pk)
+
+
+@metrics.register
+def user_cache_metrics():
+    return [
+        (f'taskmanager_user_cache_{name}', {}, value)
+        for name, value in user_cache.stats().items()
+    ]
@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.dispatch import receiver
+
+from . import metrics
+from .models import Task
+from .routing import routed
+from .aio import fetch
+from .search import AUTOCOMPLETE_LIMIT, aautocomplete, autocomplete, rank_suggestions
+from .signals import task_changed
+from .singleflight import flight_key, single_flight
+from .text import index_terms, normalize, query_terms
+
+
+def suggestion_key(user_id, query, limit):
+    # rank_title и query_terms нормализуют запрос, поэтому «Отч» и «отч » дают один ключ.
+    return flight_key(user_id, 'autocomplete', normalize(query).strip(), limit)
+
+
+class TitleIndex:
+    __slots__ = ('titles', 'postings', 'size', 'built_at')
+
+    def __init__(self, titles, postings, built_at):
+        self.titles = titles
+        self.postings = postings
+        self.size = sum(len(positions) for positions in postings.values())
+        self.built_at = built_at
+
+    @classmethod
+    def build(cls, docs, built_at):
+        # Позиция задачи в titles совпадает с порядком Task.meta['ordering'],
+        # поэтому пересечение множеств позиций сразу даёт порядок по дате.
+        titles, postings = [], {}
+        for position, doc in enumerate(docs):
+            titles.append(doc['title'])
+            for term in doc.get('search_terms') or index_terms(doc['title']):
+                postings.setdefault(term, []).append(position)
+        return cls(titles, postings, built_at)
+
+    def candidates(self, terms):
+        matched = None
+        for term in terms:
+            positions = set(self.postings.get(term, ()))
+            matched = positions if matched is None else matched & positions
+            if not matched:
+                return []
+        return [self.titles[position] for position in sorted(matched)]
+
+
+class AutocompleteCache:
+    # max_terms ограничивает индекс одного пользователя, max_total_terms — все индексы
+    # процесса вместе: без него худший случай — max_users × max_terms позиций.
+    def __init__(self, max_users=1000, max_tasks=5000, max_terms=100000, max_total_terms=2000000,
+                 ttl=60, clock=time.monotonic):
+        self.max_users = max_users
+        self.max_tasks = max_tasks
+        self.max_terms = max_terms
+        self.max_total_terms = max_total_terms
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._terms = 0
+        # Поколение индекса каждого пользователя: запись задач одного пользователя
+        # не отменяет сохранение индексов, которые строятся для других.
+        self._generations = {}
+        self._generation_floor = 0
+        self._last_generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self, user_id):
+        with self._lock:
+            return self._generations.get(user_id, self._generation_floor)
+
+    def remove(self, user_id):
+        # Под блокировкой.
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._terms -= entry.size
+        return entry
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and self.clock() - entry.built_at > self.ttl:
+                self.remove(user_id)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            return entry
+
+    def put(self, user_id, entry, generation):
+        with self._lock:
+            # Пока индекс строился, задачи пользователя могли измениться: такой индекс не сохраняем.
+            if generation != self._generations.get(user_id, self._generation_floor):
+                return
+            self.remove(user_id)
+            self._entries[user_id] = entry
+            self._terms += entry.size
+            while len(self._entries) > self.max_users or self._terms > self.max_total_terms:
+                _, evicted = self._entries.popitem(last=False)
+                self._terms -= evicted.size
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._last_generation += 1
+            self._generations[user_id] = self._last_generation
+            if len(self._generations) > 10 * self.max_users:
+                # Пользователи без записанного поколения получают номер последнего: индексы,
+                # начатые раньше, не сохранятся, и устаревший индекс не попадёт в кэш.
+                self._generations.clear()
+                self._generation_floor = self._last_generation
+            if self.remove(user_id) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._terms = 0
+
+    def queryset(self, user_id):
+        return routed(Task.objects(user_id=user_id)).only('title', 'search_terms').limit(self.max_tasks + 1)
+
+    def load(self, user_id):
+        return self.build(list(self.queryset(user_id).as_pymongo()))
+
+    async def aload(self, user_id):
+        return self.build(await fetch(self.queryset(user_id)))
+
+    def build(self, docs):
+        if len(docs) > self.max_tasks:
+            return None
+        entry = TitleIndex.build(docs, self.clock())
+        if entry.size > self.max_terms:
+            return None
+        return entry
+
+    def suggest(self, user_id, query, limit=AUTOCOMPLETE_LIMIT):
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        generation = self.generation(user_id)
+        entry = self.get(user_id)
+        if entry is None:
+            # Индекс сам кэшируется, поэтому окно single-flight ему не нужно.
+            entry = single_flight.do(flight_key(user_id, 'autocomplete_index'), lambda: self.load(user_id), window=0)
+            if entry is None:
+                # Слишком большой индекс не кэшируется: запрос идёт в MongoDB.
+                with self._lock:
+                    self.bypasses += 1
+                return single_flight.do(
+                    suggestion_key(user_id, query, limit), lambda: autocomplete(user_id, query, limit)
+                )
+            self.put(user_id, entry, generation)
+
+        return rank_suggestions(entry.candidates(terms), query, limit)
+
+    async def asuggest(self, user_id, query, limit=AUTOCOMPLETE_LIMIT):
+        # Промах кэша читает задачи асинхронным драйвером; попадание не выполняет ввода-вывода.
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        generation = self.generation(user_id)
+        entry = self.get(user_id)
+        if entry is None:
+            entry = await single_flight.ado(
+                flight_key(user_id, 'autocomplete_index'), lambda: self.aload(user_id), window=0
+            )
+            if entry is None:
+                with self._lock:
+                    self.bypasses += 1
+                return await single_flight.ado(
+                    suggestion_key(user_id, query, limit), lambda: aautocomplete(user_id, query, limit)
+                )
+            self.put(user_id, entry, generation)
+
+        return rank_suggestions(entry.candidates(terms), query, limit)
+
+    def stats(self):
+        with self._lock:
+            users = len(self._entries)
+            terms = self._terms
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypasses': self.bypasses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'users': users,
+            'terms': terms,
+        }
+
+
+autocomplete_cache = AutocompleteCache(**{
+    key.lower(): value for key, value in getattr(settings, 'TASK_AUTOCOMPLETE_CACHE', {}).items()
+})
+
+
+@receiver(task_changed)
+def invalidate_autocomplete(sender, user_id, **kwargs):
+    autocomplete_cache.invalidate(user_id)
+
+
+@metrics.register
+def autocomplete_metrics():
+    return [
+        (f'taskmanager_autocomplete_cache_{name}', {}, value)
+        for name, value in autocomplete_cache.stats().items()
+    ]
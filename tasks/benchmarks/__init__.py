@@ -0,0 +1,13 @@
+import statistics
+import time
+
+
+def measure(func, repeat=5, number=1000):
+    # Возвращает время одного вызова (мкс) в лучшем и медианном прогоне.
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        runs.append((time.perf_counter() - started) / number * 1e6)
+    return {'best_us': min(runs), 'median_us': statistics.median(runs)}
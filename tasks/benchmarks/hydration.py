@@ -0,0 +1,83 @@
+import gc
+import tracemalloc
+from datetime import datetime
+
+from bson import ObjectId
+
+from tasks.board import CARD_FIELDS, card_from_document
+from tasks.models import Task
+from tasks.readmodel import TaskRow
+from tasks.text import index_terms
+from . import measure
+from .middleware import DESCRIPTION
+
+
+TASKS = 10000
+
+# Поля, которые MongoDB возвращает для карточки доски при only(*CARD_FIELDS).
+CARD_KEYS = ('_id',) + tuple(field for field in CARD_FIELDS if field != 'id')
+
+
+def raw_documents(count=TASKS):
+    # Документы в том виде, в каком их отдаёт PyMongo без проекции.
+    now = datetime(2025, 6, 1, 12, 0)
+    description = DESCRIPTION[:1000]
+    return [
+        {
+            '_id': ObjectId(),
+            'title': f'Подготовить отчёт №{number}',
+            'description': description,
+            'completed': False,
+            'status': ('todo', 'in_progress', 'done')[number % 3],
+            'priority': number % 3,
+            'user_id': 1,
+            'created_at': now,
+            'updated_at': now,
+            'due_date': now if number % 2 else None,
+            'search_terms': index_terms(f'Подготовить отчёт №{number}', description),
+        }
+        for number in range(count)
+    ]
+
+
+def project(docs, keys):
+    return [{key: doc[key] for key in keys if key in doc} for doc in docs]
+
+
+def retained_bytes(build):
+    # Память, которую удерживает результат build() (исходные документы не считаются).
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def run(options=None):
+    # Время и память на TASKS задач без сети и разбора BSON (проекция уменьшает и их).
+    docs = raw_documents()
+    card_docs = project(docs, CARD_KEYS)
+    row_fields = TaskRow.FIELDS
+
+    paths = {
+        # Прежний путь: QuerySet без проекции собирает Document из каждого документа.
+        'document': lambda: [Task._from_son(doc) for doc in docs],
+        'task_row': lambda: [TaskRow(doc, row_fields) for doc in docs],
+        'card_projection': lambda: project(docs, CARD_KEYS),
+        'card_view_model': lambda: [card_from_document(doc) for doc in card_docs],
+    }
+
+    results = {}
+    for name, build in paths.items():
+        timing = measure(build, repeat=3, number=1)
+        results[name] = {
+            'ms': timing['median_us'] / 1000,
+            'retained_kib': retained_bytes(build) / 1024,
+        }
+
+    baseline = results['document']
+    for name, result in results.items():
+        result['speedup'] = baseline['ms'] / result['ms']
+    return results
@@ -0,0 +1,77 @@
+import re
+
+from django.test import RequestFactory
+
+from tasks.middleware import SQL_INJECTION_MESSAGE, XSS_MESSAGE, SecurityMiddleware
+from . import measure
+
+
+DESCRIPTION = (
+    'Подготовить квартальный отчёт для отдела продаж и согласовать его с руководителем. '
+    'Собрать данные из CRM, проверить расхождения с бухгалтерией и оформить сводную таблицу. '
+) * 6
+
+DESCRIPTION_EN = (
+    'Prepare the quarterly sales report for the department and agree it with the manager. '
+    'Collect data from CRM, check discrepancies with accounting and build a summary table. '
+) * 6
+
+PAYLOADS = {
+    'create_form': {
+        'title': 'Подготовить квартальный отчёт по продажам',
+        'description': DESCRIPTION[:1000],
+        'status': 'in_progress',
+        'priority': '2',
+        'due_date': '2025-12-31T18:00',
+        'csrfmiddlewaretoken': 'x' * 64,
+    },
+    'create_form_en': {
+        'title': 'Prepare the quarterly sales report',
+        'description': DESCRIPTION_EN[:1000],
+        'status': 'todo',
+        'priority': '1',
+        'due_date': '2025-12-31T18:00',
+        'csrfmiddlewaretoken': 'x' * 64,
+    },
+    'login_form': {
+        'username': 'manager_ivanov',
+        'password': 'S3curePassw0rd2025',
+        'csrfmiddlewaretoken': 'x' * 64,
+    },
+}
+
+
+class LegacySecurityScanner:
+    # Прежняя реализация: re.search по каждому из 12 шаблонов для каждого поля.
+    def __init__(self):
+        self.sql_patterns = SecurityMiddleware.SQL_INJECTION_PATTERNS
+        self.xss_patterns = SecurityMiddleware.XSS_PATTERNS
+
+    def process_request(self, request):
+        if request.method == 'POST':
+            for key, value in request.POST.items():
+                if isinstance(value, str):
+                    if any(re.search(p, value, re.IGNORECASE) for p in self.sql_patterns):
+                        return SQL_INJECTION_MESSAGE
+                    if any(re.search(p, value, re.IGNORECASE) for p in self.xss_patterns):
+                        return XSS_MESSAGE
+        return None
+
+
+def run(options=None):
+    factory = RequestFactory()
+    current = SecurityMiddleware(lambda request: None)
+    legacy = LegacySecurityScanner()
+
+    results = {}
+    for name, payload in PAYLOADS.items():
+        request = factory.post('/', payload)
+        request.POST  # QueryDict разбирается один раз и не входит в замер.
+        legacy_time = measure(lambda: legacy.process_request(request))
+        current_time = measure(lambda: current.process_request(request))
+        results[name] = {
+            'legacy': legacy_time,
+            'current': current_time,
+            'speedup': legacy_time['median_us'] / current_time['median_us'],
+        }
+    return results
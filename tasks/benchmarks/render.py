@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from bson import ObjectId
+from django.template import engines
+from django.template.loader import render_to_string
+
+from tasks.board import card_from_document
+from . import measure
+
+
+CARDS = 1000
+
+# Прежняя карточка: цепочки if по приоритету, truncatewords и два {% url %} на карточку.
+LEGACY_CARD_LIST = '''{% for task in cards %}
+<div class="kanban-card {% if task.priority == 0 %}priority-low{% elif task.priority == 1 %}priority-medium{% else %}priority-high{% endif %}">
+    <div class="kanban-card-title">{{ task.title }}</div>
+    {% if task.description %}
+        <div class="kanban-card-desc">{{ task.description|truncatewords:15 }}</div>
+    {% endif %}
+    <div class="kanban-card-meta">
+        <span class="priority-badge {% if task.priority == 0 %}low{% elif task.priority == 1 %}medium{% else %}high{% endif %}">
+            {% if task.priority == 0 %}НИЗКИЙ{% elif task.priority == 1 %}СРЕДНИЙ{% else %}ВЫСОКИЙ{% endif %}
+        </span>
+        {% if task.due_date %}
+            <span>Срок: {{ task.due_date|date:"d.m.Y" }}</span>
+        {% endif %}
+    </div>
+    <div class="kanban-card-actions">
+        <a href="{% url 'task_edit' task.id %}">Редактировать</a>
+        <a href="{% url 'task_delete' task.id %}">Удалить</a>
+    </div>
+</div>
+{% endfor %}'''
+
+
+def sample_documents(count=CARDS):
+    return [
+        {
+            '_id': ObjectId(),
+            'title': f'Подготовить отчёт №{number}',
+            'description': 'Собрать данные из CRM, проверить расхождения с бухгалтерией '
+                           'и оформить сводную таблицу для отдела продаж к пятнице.',
+            'status': 'todo',
+            'priority': number % 3,
+            'due_date': datetime(2025, 12, 31, 18, 0) if number % 2 else None,
+        }
+        for number in range(count)
+    ]
+
+
+def legacy_card(doc):
+    return {
+        'id': str(doc['_id']),
+        'title': doc['title'],
+        'description': doc['description'],
+        'status': doc['status'],
+        'priority': doc['priority'],
+        'due_date': doc['due_date'],
+    }
+
+
+def run(options=None):
+    docs = sample_documents()
+    legacy_template = engines['django'].from_string(LEGACY_CARD_LIST)
+
+    def legacy():
+        return legacy_template.render({'cards': [legacy_card(doc) for doc in docs]})
+
+    def current():
+        return render_to_string('tasks/_task_card_list.html', {'cards': [card_from_document(doc) for doc in docs]})
+
+    # Время указано на CARDS карточек, включая построение моделей карточек.
+    legacy_time = measure(legacy, repeat=5, number=5)
+    current_time = measure(current, repeat=5, number=5)
+    return {
+        f'cards_{CARDS}': {
+            'legacy': legacy_time,
+            'current': current_time,
+            'speedup': legacy_time['median_us'] / current_time['median_us'],
+        }
+    }
@@ -0,0 +1,247 @@
+import copy
+import logging
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+import mongoengine
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from tasks.connection import register_connection
+from tasks.models import Task
+from tasks.operations import new_task_document
+from .middleware import DESCRIPTION, PAYLOADS
+
+
+TASKS_PER_USER = 1000
+USERS = 1
+REQUESTS = 200
+CONCURRENCY = 1
+WARMUP = 5
+SEED_BATCH_SIZE = 1000
+
+TITLES = [
+    'Подготовить отчёт по продажам',
+    'Проверить договор с поставщиком',
+    'Созвониться с клиентом',
+    'Обновить документацию API',
+    'Исправить ошибку в форме входа',
+    'Согласовать бюджет отдела',
+]
+STATUSES = ['todo', 'in_progress', 'done']
+
+
+@contextmanager
+def benchmark_database(use_mongomock=False):
+    # Отдельная база MongoDB (<NAME>_benchmark) и тестовая база SQLite:
+    # рабочие данные не затрагиваются, после прогона всё удаляется.
+    config = dict(settings.MONGODB, NAME=f"{settings.MONGODB['NAME']}_benchmark")
+    if use_mongomock:
+        try:
+            import mongomock
+        except ImportError:
+            raise CommandError('Для --mongomock установите пакет mongomock.')
+        config['ASYNC'] = False
+
+    timing = {'SAMPLE_RATE': 1.0, 'SERVER_TIMING': False, 'LOG': False}
+    # Сценарий task_create_rejected получает 400 на каждый запрос; предупреждения не нужны.
+    request_logger = logging.getLogger('django.request')
+    request_level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    with override_settings(MONGODB=config, TASK_REQUEST_TIMING=timing):
+        mongoengine.disconnect()
+        if use_mongomock:
+            mongoengine.connect(config['NAME'], host='mongodb://localhost', mongo_client_class=mongomock.MongoClient)
+        else:
+            register_connection()
+        test_database = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            Task.drop_collection()
+            Task.ensure_indexes()
+            yield
+        finally:
+            Task.drop_collection()
+            connection.creation.destroy_test_db(test_database, verbosity=0)
+            mongoengine.disconnect()
+            request_logger.setLevel(request_level)
+    register_connection()
+
+
+def seed_tasks(user_id, count, batch_size=SEED_BATCH_SIZE):
+    collection = Task._get_collection()
+    batch = []
+    for number in range(count):
+        batch.append(new_task_document(user_id, {
+            'title': f'{TITLES[number % len(TITLES)]} №{number}',
+            'description': DESCRIPTION[:1000],
+            'status': STATUSES[number % len(STATUSES)],
+            'priority': number % 3,
+            'due_date': datetime(2025, 12, 31, 18, 0) if number % 4 == 0 else None,
+        }))
+        if len(batch) == batch_size:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+class ViewBench:
+    def __init__(self, users, tasks_per_user, seed=0):
+        self.random = random.Random(seed)
+        self.users = []
+        self.clients = []
+        self.task_ids = []
+        # Тестовая база SQLite в памяти переживает повторный запуск в том же процессе.
+        User.objects.filter(username__startswith='bench_user_').delete()
+        for number in range(users):
+            user = User.objects.create_user(username=f'bench_user_{number}', password='S3curePassw0rd2025')
+            seed_tasks(user.id, tasks_per_user)
+            self.users.append(user)
+            self.clients.append(self.login(user))
+            self.task_ids.append([str(task_id) for task_id in Task.objects(user_id=user.id).scalar('id')])
+        self.turn = 0
+
+    def login(self, user):
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(user)
+        return client
+
+    def fork(self, seed):
+        # Тестовый клиент хранит cookie и не рассчитан на общий доступ из потоков:
+        # каждому потоку свои клиенты. Списки задач общие, поэтому удалённую задачу
+        # другой поток уже не выберет.
+        bench = copy.copy(self)
+        bench.random = random.Random(seed)
+        bench.clients = [self.login(user) for user in self.users]
+        return bench
+
+    def next_user(self):
+        self.turn = (self.turn + 1) % len(self.clients)
+        return self.clients[self.turn], self.task_ids[self.turn]
+
+    def get(self, name, **params):
+        client, _ = self.next_user()
+        return client.get(reverse(name), params)
+
+    def post(self, name, data):
+        client, _ = self.next_user()
+        return client.post(reverse(name), data)
+
+    def task_request(self, name, method='get', data=None, pop=False):
+        client, task_ids = self.next_user()
+        if not task_ids:
+            return None
+        task_id = task_ids.pop() if pop else self.random.choice(task_ids)
+        url = reverse(name, args=[task_id])
+        return client.post(url, data) if method == 'post' else client.get(url)
+
+    def after_write(self):
+        # Сообщения «Задача создана» иначе копятся в cookie и раздувают следующие запросы.
+        for client in self.clients:
+            client.cookies.pop('messages', None)
+
+
+SCENARIOS = {
+    'task_list': lambda bench: bench.get('task_list'),
+    'task_list_search': lambda bench: bench.get('task_list', search='отчёт'),
+    'task_list_filtered': lambda bench: bench.get('task_list', status='todo', priority='2'),
+    'task_autocomplete': lambda bench: bench.get('task_autocomplete', q='отч'),
+    'task_create': lambda bench: bench.post('task_create', PAYLOADS['create_form']),
+    'task_create_rejected': lambda bench: bench.post('task_create', dict(PAYLOADS['create_form'], title="' OR 1=1 --")),
+    'task_edit': lambda bench: bench.task_request('task_edit', 'post', PAYLOADS['create_form_en']),
+    'task_toggle': lambda bench: bench.task_request('task_toggle'),
+    'task_delete': lambda bench: bench.task_request('task_delete', 'post', pop=True),
+}
+
+
+def percentile(cuts, value):
+    return cuts[value - 1] * 1000
+
+
+def measure(bench, scenario, requests):
+    latencies, timings, errors = [], [], 0
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = scenario(bench)
+        elapsed = time.perf_counter() - started
+        if response is None:
+            break
+        latencies.append(elapsed)
+        timings.append(response.wsgi_request.timings)
+        if response.status_code >= 500:
+            errors += 1
+        bench.after_write()
+    return latencies, timings, errors
+
+
+def measure_in_thread(bench, scenario, requests):
+    try:
+        return measure(bench, scenario, requests)
+    finally:
+        connection.close()
+
+
+def run_scenario(bench, scenario, requests, concurrency=CONCURRENCY):
+    for _ in range(WARMUP):
+        scenario(bench)
+    bench.after_write()
+
+    # Запросы делятся между потоками поровну; пропускная способность считается по
+    # времени всего прогона, а не по сумме задержек, иначе параллельность не видна.
+    if concurrency > 1:
+        benches = [bench.fork(seed) for seed in range(concurrency)]
+        shares = [requests // concurrency + (number < requests % concurrency) for number in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(measure_in_thread, benches, [scenario] * concurrency, shares))
+    else:
+        started = time.perf_counter()
+        results = [measure(bench, scenario, requests)]
+    wall = time.perf_counter() - started
+
+    latencies = [latency for result in results for latency in result[0]]
+    timings = [timing for result in results for timing in result[1]]
+    errors = sum(result[2] for result in results)
+    count = len(latencies)
+    if not count:
+        return {'requests': 0, 'errors': errors}
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if count > 1 else latencies * 99
+    return {
+        'requests': count,
+        'errors': errors,
+        'p50_ms': percentile(cuts, 50),
+        'p95_ms': percentile(cuts, 95),
+        'p99_ms': percentile(cuts, 99),
+        'mean_ms': statistics.fmean(latencies) * 1000,
+        'throughput_rps': count / wall,
+        'mongo_commands': statistics.fmean(timing.mongo_commands for timing in timings),
+        'mongo_ms': statistics.fmean(timing.mongo_seconds for timing in timings) * 1000,
+        'sql_queries': statistics.fmean(timing.sql_queries for timing in timings),
+        'sql_ms': statistics.fmean(timing.sql_seconds for timing in timings) * 1000,
+        'template_ms': statistics.fmean(timing.template_seconds for timing in timings) * 1000,
+    }
+
+
+def run(options=None):
+    options = options or {}
+    users = options.get('users') or USERS
+    tasks_per_user = options.get('tasks') or TASKS_PER_USER
+    requests = options.get('requests') or REQUESTS
+    concurrency = options.get('concurrency') or CONCURRENCY
+    if concurrency < 1:
+        raise CommandError('--concurrency должно быть не меньше 1.')
+
+    with benchmark_database(options.get('mongomock', False)):
+        bench = ViewBench(users, tasks_per_user)
+        return {
+            name: run_scenario(bench, scenario, requests, concurrency)
+            for name, scenario in SCENARIOS.items()
+        }
@@ -0,0 +1,204 @@
+import base64
+import binascii
+from datetime import datetime
+from functools import cache
+
+from bson import ObjectId
+from django.urls import reverse
+from django.utils.text import Truncator
+
+from .aio import fetch
+from .models import ArchivedTask, Task
+from .routing import routed
+from .search import search_filter
+
+
+BOARD_COLUMNS = (
+    ('todo', 'Сделать'),
+    ('in_progress', 'В работе'),
+    ('done', 'Готово'),
+)
+
+PRIORITY_VALUES = ('0', '1', '2')
+
+CARD_FIELDS = ('id', 'title', 'description', 'status', 'priority', 'due_date', 'created_at')
+
+# priority -> (класс карточки, класс значка, подпись); неизвестные значения
+# отображаются как высокий приоритет, как и раньше в шаблоне.
+PRIORITY_STYLES = {
+    0: ('priority-low', 'low', 'НИЗКИЙ'),
+    1: ('priority-medium', 'medium', 'СРЕДНИЙ'),
+    2: ('priority-high', 'high', 'ВЫСОКИЙ'),
+}
+
+DESCRIPTION_WORDS = 15
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def board_queryset(user_id, search_query='', priority_filter='', document=Task):
+    tasks = routed(document.objects(user_id=user_id))
+
+    if search_query:
+        tasks = search_filter(tasks, search_query)
+
+    if priority_filter in PRIORITY_VALUES:
+        tasks = tasks.filter(priority=int(priority_filter))
+
+    return tasks
+
+
+def archive_queryset(user_id, search_query='', priority_filter=''):
+    # Архив читается только при поиске: обычная доска не выходит за горячую коллекцию.
+    if not search_query:
+        return None
+    return board_queryset(user_id, search_query, priority_filter, document=ArchivedTask)
+
+
+def status_query(status):
+    # Документы без поля status исторически попадали в колонку «Сделать».
+    if status == 'todo':
+        return {'status': {'$in': ['todo', None]}}
+    return {'status': status}
+
+
+def count_by_status(tasks):
+    counts = {status: 0 for status, _ in BOARD_COLUMNS}
+    pipeline = [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}]
+
+    for row in tasks.order_by().aggregate(pipeline):
+        status = row['_id'] or 'todo'
+        if status in counts:
+            counts[status] += row['count']
+
+    return counts
+
+
+def encode_cursor(created_at, task_id):
+    raw = f'{created_at.isoformat()}|{task_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, task_id = raw.split('|')
+        return datetime.fromisoformat(created_at), ObjectId(task_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def keyset_query(cursor):
+    # Продолжение сортировки meta['ordering'] модели Task: (-created_at, -id).
+    created_at, task_id = decode_cursor(cursor)
+    return {'$or': [
+        {'created_at': {'$lt': created_at}},
+        {'created_at': created_at, '_id': {'$lt': task_id}},
+    ]}
+
+
+@cache
+def task_url_parts(name):
+    # URL задачи собирается из префикса и суффикса вместо reverse() на каждую карточку.
+    placeholder = '0' * 24
+    prefix, suffix = reverse(name, args=[placeholder]).split(placeholder)
+    return prefix, suffix
+
+
+def task_url(name, task_id):
+    prefix, suffix = task_url_parts(name)
+    return f'{prefix}{task_id}{suffix}'
+
+
+def card_from_document(doc):
+    task_id = str(doc['_id'])
+    priority = doc.get('priority', 0)
+    card_class, badge_class, label = PRIORITY_STYLES.get(priority, PRIORITY_STYLES[2])
+    description = doc.get('description')
+    due_date = doc.get('due_date')
+    return {
+        'id': task_id,
+        'title': doc.get('title', ''),
+        'description': Truncator(description).words(DESCRIPTION_WORDS, truncate=' …') if description else '',
+        'status': doc.get('status') or 'todo',
+        'priority': priority,
+        'priority_class': card_class,
+        'priority_badge': badge_class,
+        'priority_label': label,
+        'due_date': due_date,
+        'due_label': due_date.strftime('%d.%m.%Y') if due_date else '',
+        'archived': doc.get('archived', False),
+        'edit_url': task_url('task_edit', task_id),
+        'delete_url': task_url('task_delete', task_id),
+    }
+
+
+def column_queryset(tasks, status, cursor=None, limit=PAGE_SIZE):
+    tasks = tasks.filter(__raw__=status_query(status))
+    if cursor:
+        tasks = tasks.filter(__raw__=keyset_query(cursor))
+    return tasks.only(*CARD_FIELDS).limit(limit + 1)
+
+
+def column_page(tasks, status, cursor=None, limit=PAGE_SIZE, archived=None):
+    docs = list(column_queryset(tasks, status, cursor, limit).as_pymongo())
+    if archived is not None and status == 'done':
+        docs = merge_archived(docs, list(column_queryset(archived, status, cursor, limit).as_pymongo()))
+    return page_from_documents(docs, limit)
+
+
+async def acolumn_page(tasks, status, cursor=None, limit=PAGE_SIZE, archived=None):
+    docs = await fetch(column_queryset(tasks, status, cursor, limit))
+    if archived is not None and status == 'done':
+        docs = merge_archived(docs, await fetch(column_queryset(archived, status, cursor, limit)))
+    return page_from_documents(docs, limit)
+
+
+def merge_archived(docs, archived_docs):
+    # Обе выборки упорядочены по (-created_at, -id) и начинаются с одного курсора,
+    # поэтому первые limit + 1 документов слияния — верная страница колонки «Готово».
+    for doc in archived_docs:
+        doc['archived'] = True
+    return sorted(docs + archived_docs, key=lambda doc: (doc['created_at'], doc['_id']), reverse=True)
+
+
+def page_from_documents(docs, limit):
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last['created_at'], last['_id'])
+
+    return [card_from_document(doc) for doc in docs], next_cursor
+
+
+def build_board(user_id, search_query='', status_filter='', priority_filter='', limit=PAGE_SIZE):
+    tasks = board_queryset(user_id, search_query, priority_filter)
+    counts = count_by_status(tasks)
+    archived = archive_queryset(user_id, search_query, priority_filter)
+    if archived is not None and status_filter in ('', 'done'):
+        counts['done'] += archived.order_by().count()
+
+    columns = []
+    for status, title in BOARD_COLUMNS:
+        visible = not status_filter or status_filter == status
+        cards, next_cursor = [], None
+        if visible and counts[status]:
+            cards, next_cursor = column_page(tasks, status, limit=limit, archived=archived)
+        columns.append({
+            'status': status,
+            'title': title,
+            'count': counts[status] if visible else 0,
+            'cards': cards,
+            'next_cursor': next_cursor,
+        })
+
+    return {
+        'columns': columns,
+        'total': sum(column['count'] for column in columns),
+    }
@@ -0,0 +1,182 @@
+import copy
+import threading
+import time
+
+import mongoengine
+from django.conf import settings
+from pymongo import ReadPreference, monitoring
+
+from . import metrics
+
+
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST,
+}
+
+CLIENT_OPTIONS = {
+    'MAX_POOL_SIZE': 'maxPoolSize',
+    'MIN_POOL_SIZE': 'minPoolSize',
+    'MAX_IDLE_TIME_MS': 'maxIdleTimeMS',
+    'WAIT_QUEUE_TIMEOUT_MS': 'waitQueueTimeoutMS',
+    'CONNECT_TIMEOUT_MS': 'connectTimeoutMS',
+    'SERVER_SELECTION_TIMEOUT_MS': 'serverSelectionTimeoutMS',
+    'SOCKET_TIMEOUT_MS': 'socketTimeoutMS',
+}
+
+
+def client_options(config=None):
+    # Параметры MongoClient (и AsyncMongoClient) из settings.MONGODB.
+    config = settings.MONGODB if config is None else config
+    options = {
+        option: config[key]
+        for key, option in CLIENT_OPTIONS.items()
+        if config.get(key) is not None
+    }
+
+    name = config.get('READ_PREFERENCE') or 'primary'
+    if name not in READ_PREFERENCES:
+        raise ValueError(f'Неизвестный MONGODB READ_PREFERENCE: {name}')
+    options['read_preference'] = READ_PREFERENCES[name]
+
+    if config.get('COMPRESSORS'):
+        options['compressors'] = config['COMPRESSORS']
+    return options
+
+
+def register_connection():
+    # register_connection() только запоминает параметры: клиент и пул создаются
+    # при первом запросе к Task, а не при импорте настроек.
+    config = settings.MONGODB
+    mongoengine.register_connection(
+        mongoengine.DEFAULT_CONNECTION_NAME,
+        db=config['NAME'],
+        host=config['URI'],
+        event_listeners=[pool_metrics.for_client('main')],
+        **client_options(config)
+    )
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    # Статистика ведётся по паре (клиент, адрес): у основного и асинхронных клиентов свои
+    # пулы к одному серверу, и закрытие одного из них не сбрасывает статистику остальных.
+    def __init__(self, clock=time.monotonic, client='main'):
+        self.clock = clock
+        self.client = client
+        self.pools = {}
+        self._lock = threading.Lock()
+        self._started = threading.local()
+
+    def for_client(self, client):
+        # Слушатель для event_listeners клиента: копия делит с исходным объектом
+        # словарь пулов и блокировку, поэтому все пулы попадают в одни метрики.
+        listener = copy.copy(self)
+        listener.client = client
+        return listener
+
+    def pool_key(self, address):
+        return self.client, '{}:{}'.format(*address)
+
+    def pool(self, address):
+        key = self.pool_key(address)
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = {
+                'connections': 0,
+                'checked_out': 0,
+                'checkouts': 0,
+                'checkout_failures': 0,
+                'clears': 0,
+                'wait_seconds_sum': 0.0,
+                'wait_seconds_max': 0.0,
+            }
+        return pool
+
+    def wait_time(self, event):
+        # PyMongo 4.7+ передаёт длительность ожидания в событии.
+        duration = getattr(event, 'duration', None)
+        if duration is None:
+            started = getattr(self._started, 'value', None)
+            duration = self.clock() - started if started is not None else 0.0
+        return duration
+
+    def record_wait(self, pool, duration):
+        pool['wait_seconds_sum'] += duration
+        pool['wait_seconds_max'] = max(pool['wait_seconds_max'], duration)
+
+    def pool_created(self, event):
+        with self._lock:
+            self.pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool(event.address)['clears'] += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.pools.pop(self.pool_key(event.address), None)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.pool(event.address)['connections'] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.pool(event.address)['connections'] -= 1
+
+    def connection_check_out_started(self, event):
+        self._started.value = self.clock()
+
+    def connection_check_out_failed(self, event):
+        duration = self.wait_time(event)
+        with self._lock:
+            pool = self.pool(event.address)
+            pool['checkout_failures'] += 1
+            self.record_wait(pool, duration)
+
+    def connection_checked_out(self, event):
+        duration = self.wait_time(event)
+        with self._lock:
+            pool = self.pool(event.address)
+            pool['checked_out'] += 1
+            pool['checkouts'] += 1
+            self.record_wait(pool, duration)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.pool(event.address)['checked_out'] -= 1
+
+    def samples(self):
+        with self._lock:
+            pools = {key: dict(pool) for key, pool in self.pools.items()}
+        samples = [('taskmanager_mongodb_pool_max_size', {}, settings.MONGODB.get('MAX_POOL_SIZE') or 0)]
+        for (client, address), pool in pools.items():
+            labels = {'client': client, 'address': address}
+            samples.extend([
+                ('taskmanager_mongodb_pool_connections', labels, pool['connections']),
+                ('taskmanager_mongodb_pool_checked_out', labels, pool['checked_out']),
+                ('taskmanager_mongodb_pool_checkouts_total', labels, pool['checkouts']),
+                ('taskmanager_mongodb_pool_checkout_failures_total', labels, pool['checkout_failures']),
+                ('taskmanager_mongodb_pool_clears_total', labels, pool['clears']),
+                ('taskmanager_mongodb_pool_wait_seconds_sum', labels, round(pool['wait_seconds_sum'], 6)),
+                ('taskmanager_mongodb_pool_wait_seconds_count', labels, pool['checkouts'] + pool['checkout_failures']),
+                ('taskmanager_mongodb_pool_wait_seconds_max', labels, round(pool['wait_seconds_max'], 6)),
+            ])
+        return samples
+
+
+pool_metrics = PoolMetrics()
+
+
+@metrics.register
+def mongodb_pool_metrics():
+    return pool_metrics.samples()
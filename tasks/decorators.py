@@ -1,23 +1,25 @@
 from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
-from .models import Task
+from .operations import get_owned_task
 
 
-def task_owner_required(view_func):
-    @wraps(view_func)
-    def wrapper(request, task_id, *args, **kwargs):
-        try:
-            task = Task.objects.get(id=task_id)
-        except Task.DoesNotExist:
-            messages.error(request, 'Задача не найдена.')
-            return redirect('task_list')
+def task_owner_required(view_func=None, *, methods=None, fields=None):
+    # Загружает задачу одним запросом с фильтром по владельцу и передаёт её
+    # во view аргументом task. Для методов вне methods задача не загружается.
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, task_id, *args, **kwargs):
+            if methods is None or request.method in methods:
+                task = get_owned_task(task_id, request.user.id, fields)
+                if task is None:
+                    messages.error(request, 'Задача не найдена.')
+                    return redirect('task_list')
+                kwargs['task'] = task
+            return view_func(request, task_id, *args, **kwargs)
         
-        if task.user_id != request.user.id:
-            messages.error(request, 'У вас нет прав для выполнения этого действия.')
-            return redirect('task_list')
-        
-        return view_func(request, task_id, *args, **kwargs)
+        return wrapper
     
-    return wrapper
-
+    if view_func is not None:
+        return decorator(view_func)
+    return decorator
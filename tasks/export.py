@@ -0,0 +1,116 @@
+import csv
+import json
+import zlib
+from datetime import timezone
+from itertools import chain, islice
+
+from asgiref.sync import sync_to_async
+
+from .board import board_queryset
+from .models import ArchivedTask, Task
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+EXPORT_FIELDS = (
+    'id', 'title', 'description', 'status', 'priority', 'completed',
+    'due_date', 'created_at', 'updated_at',
+)
+
+EXPORT_BATCH_SIZE = 500
+
+# Пишутся через datetime.now(), то есть в локальном времени процесса; due_date — в наивном UTC.
+LOCAL_TIME_FIELDS = ('created_at', 'updated_at')
+
+
+class Echo:
+    # csv.writer пишет строку в «файл» и возвращает результат write().
+    def write(self, value):
+        return value
+
+
+def export_documents(user_id, search_query='', priority_filter='', batch_size=EXPORT_BATCH_SIZE,
+                     include_archived=True):
+    # no_cache(): курсор не накапливает прочитанные документы в памяти. После горячей
+    # коллекции выгружается архив: выгрузка — способ забрать все задачи, включая историю.
+    documents = (Task, ArchivedTask) if include_archived else (Task,)
+    return chain.from_iterable(
+        board_queryset(user_id, search_query, priority_filter, document=document)
+        .no_cache()
+        .only(*EXPORT_FIELDS)
+        .batch_size(batch_size)
+        .as_pymongo()
+        for document in documents
+    )
+
+
+def export_row(doc):
+    row = {}
+    for field in EXPORT_FIELDS:
+        value = doc.get('_id' if field == 'id' else field)
+        if field == 'id':
+            value = str(value)
+        elif field == 'status':
+            value = value or 'todo'
+        elif hasattr(value, 'isoformat'):
+            value = export_datetime(field, value)
+        row[field] = value
+    return row
+
+
+def export_datetime(field, value):
+    # Время выгружается со смещением +00:00: импорт читает значения без смещения как
+    # время TIME_ZONE, и срок из выгрузки иначе сдвигался бы на разницу с UTC.
+    if field in LOCAL_TIME_FIELDS:
+        value = value.astimezone(timezone.utc)
+    else:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+
+def iter_csv(docs):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for doc in docs:
+        row = export_row(doc)
+        yield writer.writerow(['' if row[field] is None else row[field] for field in EXPORT_FIELDS])
+
+
+def iter_ndjson(docs):
+    for doc in docs:
+        yield json.dumps(export_row(doc), ensure_ascii=False) + '\n'
+
+
+def iter_export(docs, export_format):
+    rows = iter_csv(docs) if export_format == 'csv' else iter_ndjson(docs)
+    for row in rows:
+        yield row.encode('utf-8')
+
+
+def iter_gzip(chunks, flush_every=EXPORT_BATCH_SIZE):
+    # wbits=31 — формат gzip. Периодический Z_SYNC_FLUSH отдаёт клиенту
+    # уже сжатые данные, не дожидаясь конца выгрузки.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for number, chunk in enumerate(chunks, 1):
+        data = compressor.compress(chunk)
+        if number % flush_every == 0:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def aiter_chunks(chunks, batch_size=EXPORT_BATCH_SIZE):
+    # Под ASGI Django собрал бы синхронный итератор в список целиком. Здесь курсор
+    # читается пачками в пуле потоков, а клиент получает данные по мере выгрузки.
+    chunks = iter(chunks)
+    next_batch = sync_to_async(lambda: list(islice(chunks, batch_size)), thread_sensitive=False)
+    while True:
+        batch = await next_batch()
+        if not batch:
+            return
+        for chunk in batch:
+            yield chunk
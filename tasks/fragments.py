@@ -0,0 +1,101 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .aio import fetch
+from .board import build_board
+from .models import BoardVersion, Task
+from .routing import read_source, routed, routed_collection
+from .signals import task_changed
+from .singleflight import flight_key, single_flight
+
+
+BOARD_CACHE_TTL = getattr(settings, 'TASK_BOARD_CACHE_TTL', 300)
+
+
+def board_version(user_id):
+    # Версия хранится в MongoDB, а не в кэше процесса: удаление или перенос в архив
+    # из другого процесса (archive_tasks, другой воркер) меняет её для всех процессов.
+    # Она читается с того же узла, что и задачи: отстающая реплика отдаёт старую версию
+    # вместе со старыми данными, и они не попадают в кэш под новой версией.
+    return single_flight.do(flight_key(user_id, 'board_version'), lambda: query_board_version(user_id))
+
+
+def query_board_version(user_id):
+    doc = routed_collection(BoardVersion).find_one({'_id': user_id}, {'version': 1})
+    return doc['version'] if doc else 0
+
+
+async def aboard_version(user_id):
+    async def query():
+        docs = await fetch(routed(BoardVersion.objects(user_id=user_id)).only('version'))
+        return docs[0]['version'] if docs else 0
+    return await single_flight.ado(flight_key(user_id, 'board_version'), query)
+
+
+def bump_board_version(user_id):
+    BoardVersion._get_collection().update_one({'_id': user_id}, {'$inc': {'version': 1}}, upsert=True)
+
+
+def latest_update_queryset(user_id):
+    return routed(Task.objects(user_id=user_id)).order_by('-updated_at').only('updated_at').limit(1)
+
+
+def latest_update(user_id):
+    # Несколько вкладок с доской: запросы в пределах окна single-flight разделяют один ответ.
+    return single_flight.do(flight_key(user_id, 'latest_update'), lambda: query_latest_update(user_id))
+
+
+def query_latest_update(user_id):
+    doc = latest_update_queryset(user_id).as_pymongo().first()
+    return doc.get('updated_at') if doc else None
+
+
+def board_state(user_id, *parts):
+    # Версия меняется при любой записи через приложение в любом процессе (включая
+    # удаления), а updated_at последней задачи — и при записи в обход приложения.
+    # Last-Modified не отдаётся: updated_at хранится в местном времени и после удаления
+    # может уйти назад, поэтому проверка по If-Modified-Since давала бы ложные 304.
+    version = board_version(user_id)
+    latest = latest_update(user_id)
+    raw = '|'.join(str(part) for part in (user_id, version, latest, *parts))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def board_fragment_key(user_id, digest):
+    return f'tasks:board:{user_id}:{read_source()}:{digest}'
+
+
+def render_board(request, digest, search_query, status_filter, priority_filter):
+    key = board_fragment_key(request.user.id, digest)
+    html = cache.get(key)
+    if html is None:
+        # digest уже включает фильтры и версию доски; готовый фрагмент хранит кэш, а не окно.
+        html = single_flight.do(
+            flight_key(request.user.id, 'board', digest),
+            lambda: build_board_fragment(request, key, search_query, status_filter, priority_filter),
+            window=0,
+        )
+    return mark_safe(html)
+
+
+def build_board_fragment(request, key, search_query, status_filter, priority_filter):
+    board = build_board(request.user.id, search_query, status_filter, priority_filter)
+    html = str(render_to_string('tasks/_board.html', {
+        'columns': board['columns'],
+        'total': board['total'],
+        'search_query': search_query,
+        'status_filter': status_filter,
+        'priority_filter': priority_filter
+    }, request))
+    cache.set(key, html, BOARD_CACHE_TTL)
+    return html
+
+
+@receiver(task_changed)
+def invalidate_board(sender, user_id, **kwargs):
+    bump_board_version(user_id)
@@ -0,0 +1,145 @@
+import codecs
+import csv
+import json
+import time
+
+from pymongo.errors import BulkWriteError
+
+from .forms import TaskForm
+from .models import Task
+from .operations import clean_task_data, new_task_document
+from .signals import task_changed
+
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_FIELDS = ('title', 'description', 'status', 'priority', 'due_date')
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# Ошибки чтения самого файла: после них поток дальше не разбирается.
+READ_ERRORS = (UnicodeDecodeError, csv.Error)
+
+
+def detect_format(filename):
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+def iter_lines(stream):
+    # Поток байтов (файл, загруженный файл) читается построчно с декодированием
+    # на лету; BOM, который добавляет Excel, отбрасывается.
+    return codecs.iterdecode(stream, 'utf-8-sig')
+
+
+def iter_csv_rows(stream):
+    reader = csv.DictReader(iter_lines(stream))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_ndjson_rows(stream):
+    for line_num, line in enumerate(iter_lines(stream), 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_num, row
+
+
+def iter_rows(stream, import_format):
+    if import_format == 'ndjson':
+        return iter_ndjson_rows(stream)
+    return iter_csv_rows(stream)
+
+
+def read_error_message(exc):
+    if isinstance(exc, UnicodeDecodeError):
+        return 'Файл не в кодировке UTF-8. Сохраните его как «CSV UTF-8» и загрузите снова.'
+    return f'Некорректный CSV: {exc}.'
+
+
+def import_row(row):
+    # Лишние колонки (например, id или created_at из выгрузки) игнорируются,
+    # пустые статус и приоритет получают значения по умолчанию из TaskForm.
+    data = {}
+    for field in IMPORT_FIELDS:
+        value = row.get(field)
+        if value is None or value == '':
+            value = TaskForm.base_fields[field].initial
+        data[field] = '' if value is None else value
+    return data
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def flush_batch(collection, batch, lines, report):
+    try:
+        report.inserted += len(collection.insert_many(batch, ordered=False).inserted_ids)
+    except BulkWriteError as exc:
+        failed = {error['index']: error.get('errmsg', '') for error in exc.details.get('writeErrors', [])}
+        report.inserted += exc.details.get('nInserted', len(batch) - len(failed))
+        for index, message in sorted(failed.items()):
+            report.add_error(lines[index], {'__all__': [message]})
+
+
+def import_tasks(user_id, rows, batch_size=IMPORT_BATCH_SIZE):
+    report = ImportReport()
+    collection = Task._get_collection()
+    batch, lines = [], []
+
+    line = 0
+    try:
+        for line, row in rows:
+            report.rows += 1
+            if not isinstance(row, dict):
+                report.add_error(line, {'__all__': ['Некорректная строка.']})
+                continue
+
+            cleaned, errors = clean_task_data(import_row(row))
+            if errors:
+                report.add_error(line, errors)
+                continue
+
+            batch.append(new_task_document(user_id, cleaned))
+            lines.append(line)
+            if len(batch) >= batch_size:
+                flush_batch(collection, batch, lines, report)
+                batch, lines = [], []
+    except READ_ERRORS as exc:
+        # Уже прочитанные строки сохраняются; ошибка относится к строке после последней прочитанной.
+        report.add_error(line + 1, {'__all__': [read_error_message(exc)]})
+
+    if batch:
+        flush_batch(collection, batch, lines, report)
+
+    if report.inserted:
+        task_changed.send(sender=Task, user_id=user_id)
+    report.elapsed = time.monotonic() - report.started
+    return report
@@ -0,0 +1,239 @@
+import bisect
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+from pymongo import monitoring
+
+from . import metrics
+
+
+logger = logging.getLogger('tasks.requests')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_timings = ContextVar('tasks_request_timings', default=None)
+
+
+def timing_config():
+    return getattr(settings, 'TASK_REQUEST_TIMING', {})
+
+
+def current_timings():
+    return _timings.get()
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+class RequestTimings:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.total_seconds = 0.0
+        self.mongo_commands = 0
+        self.mongo_seconds = 0.0
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.rendering = False
+        # Запросы одного HTTP-запроса могут выполняться в пуле потоков (sync_to_async).
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def active(self):
+        token = _timings.set(self)
+        try:
+            yield self
+        finally:
+            _timings.reset(token)
+            self.total_seconds = self.clock() - self.started
+
+    def add_mongo(self, seconds):
+        with self._lock:
+            self.mongo_commands += 1
+            self.mongo_seconds += seconds
+
+    def add_sql(self, seconds):
+        with self._lock:
+            self.sql_queries += 1
+            self.sql_seconds += seconds
+
+    def server_timing(self):
+        return ', '.join([
+            f'mongo;dur={milliseconds(self.mongo_seconds)};desc="{self.mongo_commands} commands"',
+            f'sql;dur={milliseconds(self.sql_seconds)};desc="{self.sql_queries} queries"',
+            f'tpl;dur={milliseconds(self.template_seconds)}',
+            f'total;dur={milliseconds(self.total_seconds)}',
+        ])
+
+    def as_dict(self):
+        return {
+            'total_ms': milliseconds(self.total_seconds),
+            'mongo_commands': self.mongo_commands,
+            'mongo_ms': milliseconds(self.mongo_seconds),
+            'sql_queries': self.sql_queries,
+            'sql_ms': milliseconds(self.sql_seconds),
+            'template_ms': milliseconds(self.template_seconds),
+        }
+
+
+def sample_request():
+    # Без выборки контекст не создаётся, и слушатели сводятся к одной проверке ContextVar.
+    rate = timing_config().get('SAMPLE_RATE', 1.0)
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return None
+    return RequestTimings()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unresolved'
+
+
+def record_request(request, response, timings):
+    view = view_name(request)
+    request_metrics.observe(view, timings)
+
+    config = timing_config()
+    if config.get('SERVER_TIMING', True):
+        response['Server-Timing'] = timings.server_timing()
+    if config.get('LOG', True) and logger.isEnabledFor(logging.INFO):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            **timings.as_dict(),
+        }
+        logger.info(json.dumps(record, ensure_ascii=False), extra={'timing': record})
+    return response
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.record(event)
+
+    def failed(self, event):
+        self.record(event)
+
+    def record(self, event):
+        timings = _timings.get()
+        if timings is not None:
+            timings.add_mongo(event.duration_micros / 1_000_000)
+
+
+command_timer = MongoCommandTimer()
+
+
+def time_sql(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_sql(time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def install_sql_timer(sender, connection, **kwargs):
+    # Обёртка ставится на каждое соединение один раз, а не на время запроса:
+    # асинхронные представления выполняют ORM в другом потоке.
+    if time_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_sql)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _timings.get()
+        if timings is None or timings.rendering:
+            return super().render(context, request)
+
+        timings.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.rendering = False
+            timings.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    # Бэкенд шаблонов Django, который учитывает время рендеринга в RequestTimings.
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.views = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, timings):
+        with self._lock:
+            stats = self.views.get(view)
+            if stats is None:
+                stats = self.views[view] = {
+                    'buckets': [0] * (len(DURATION_BUCKETS) + 1),
+                    'requests': 0,
+                    'seconds': 0.0,
+                    'mongo_commands': 0,
+                    'mongo_seconds': 0.0,
+                    'sql_queries': 0,
+                    'sql_seconds': 0.0,
+                    'template_seconds': 0.0,
+                }
+            stats['buckets'][bisect.bisect_left(DURATION_BUCKETS, timings.total_seconds)] += 1
+            stats['requests'] += 1
+            stats['seconds'] += timings.total_seconds
+            stats['mongo_commands'] += timings.mongo_commands
+            stats['mongo_seconds'] += timings.mongo_seconds
+            stats['sql_queries'] += timings.sql_queries
+            stats['sql_seconds'] += timings.sql_seconds
+            stats['template_seconds'] += timings.template_seconds
+
+    def samples(self):
+        with self._lock:
+            views = {view: dict(stats, buckets=list(stats['buckets'])) for view, stats in self.views.items()}
+        samples = []
+        for view, stats in sorted(views.items()):
+            labels = {'view': view}
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + ('+Inf',), stats['buckets']):
+                cumulative += count
+                samples.append(('taskmanager_request_duration_seconds_bucket', dict(labels, le=bound), cumulative))
+            samples.extend([
+                ('taskmanager_request_duration_seconds_sum', labels, round(stats['seconds'], 6)),
+                ('taskmanager_request_duration_seconds_count', labels, stats['requests']),
+                ('taskmanager_request_mongo_commands_total', labels, stats['mongo_commands']),
+                ('taskmanager_request_mongo_seconds_total', labels, round(stats['mongo_seconds'], 6)),
+                ('taskmanager_request_sql_queries_total', labels, stats['sql_queries']),
+                ('taskmanager_request_sql_seconds_total', labels, round(stats['sql_seconds'], 6)),
+                ('taskmanager_request_template_seconds_total', labels, round(stats['template_seconds'], 6)),
+            ])
+        return samples
+
+
+request_metrics = RequestMetrics()
+
+
+@metrics.register
+def request_timing_metrics():
+    return request_metrics.samples()
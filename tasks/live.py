@@ -0,0 +1,336 @@
+import asyncio
+import json
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from pymongo.errors import OperationFailure, PyMongoError
+
+from . import metrics
+from .board import PRIORITY_VALUES, card_from_document
+from .models import BoardVersion, Task
+from .text import query_terms
+
+
+logger = logging.getLogger(__name__)
+
+LIVE_CONFIG = getattr(settings, 'TASK_LIVE_UPDATES', {})
+POLL_INTERVAL = LIVE_CONFIG.get('POLL_INTERVAL', 2.0)
+HEARTBEAT_INTERVAL = LIVE_CONFIG.get('HEARTBEAT_INTERVAL', 15.0)
+QUEUE_SIZE = LIVE_CONFIG.get('QUEUE_SIZE', 100)
+# False — сразу опрашивать коллекцию, не пытаясь открыть поток изменений.
+CHANGE_STREAMS = LIVE_CONFIG.get('CHANGE_STREAMS', True)
+# MongoDB 6.0+ с changeStreamPreAndPostImages на коллекции tasks: событие удаления
+# содержит прежний документ, и удаление доходит до владельца даже без записи в _owners.
+PRE_IMAGES = LIVE_CONFIG.get('PRE_IMAGES', False)
+# Сколько последних отправленных задач помнить для адресации удалений.
+TRACKED_TASKS = LIVE_CONFIG.get('TRACKED_TASKS', 100000)
+# Отдавать поток событий и под WSGI, где каждое подключение держит рабочий поток.
+WSGI_STREAMS = LIVE_CONFIG.get('WSGI_STREAMS', False)
+RETRY_MS = 3000
+
+CHANGE_PIPELINE = [{'$match': {'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}}}]
+# «The $changeStream stage is only supported on replica sets» и аналоги на mongos/standalone.
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324, 136}
+
+
+class Subscription:
+    def __init__(self, user_id, search_query='', status_filter='', priority_filter='', loop=None):
+        self.user_id = user_id
+        self.terms = set(query_terms(search_query)) if search_query else None
+        self.status_filter = status_filter
+        self.priority_filter = priority_filter if priority_filter in PRIORITY_VALUES else ''
+        # Под ASGI события приходят в asyncio.Queue цикла запроса, под WSGI — в queue.Queue потока.
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE) if loop is not None else queue.Queue(QUEUE_SIZE)
+
+    def matches(self, doc):
+        if self.terms is not None and not self.terms <= set(doc.get('search_terms') or ()):
+            return False
+        if self.status_filter and (doc.get('status') or 'todo') != self.status_filter:
+            return False
+        if self.priority_filter and doc.get('priority', 0) != int(self.priority_filter):
+            return False
+        return True
+
+    def send(self, event):
+        if self.loop is None:
+            self.deliver(event)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.deliver, event)
+        except RuntimeError:  # цикл запроса уже закрыт
+            pass
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except (asyncio.QueueFull, queue.Full):
+            # Клиент не успевает читать: вместо части событий — одна полная перезагрузка.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'resync'})
+
+
+class BoardEvents:
+    # Один наблюдатель изменений коллекции tasks на процесс раздаёт события подписчикам.
+    def __init__(self, poll_interval=POLL_INTERVAL, autostart=True):
+        self.poll_interval = poll_interval
+        self.autostart = autostart
+        self.subscribers = {}
+        self.mode = None
+        self.resume_token = None
+        self.events = 0
+        self._owners = OrderedDict()
+        self._since = datetime.now()
+        self._versions = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, user_id, *filters, loop=None):
+        subscription = Subscription(user_id, *filters, loop=loop)
+        with self._lock:
+            self.subscribers.setdefault(user_id, set()).add(subscription)
+            if self.autostart and self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self.run, name='board-events', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self.subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscribers[subscription.user_id]
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def subscriptions(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                return [subscription for group in self.subscribers.values() for subscription in group]
+            return list(self.subscribers.get(user_id, ()))
+
+    def dispatch_document(self, doc, created=False):
+        subscriptions = self.subscriptions(doc.get('user_id'))
+        if not subscriptions:
+            return
+        card = card_from_document(doc)
+        upsert = {
+            'type': 'upsert',
+            'id': card['id'],
+            'status': card['status'],
+            'created': created,
+            'html': render_to_string('tasks/_task_card_list.html', {'cards': [card]}),
+        }
+        delete = {'type': 'delete', 'id': card['id']}
+        with self._lock:
+            self._owners[doc['_id']] = doc.get('user_id')
+            self._owners.move_to_end(doc['_id'])
+            while len(self._owners) > TRACKED_TASKS:
+                self._owners.popitem(last=False)
+        for subscription in subscriptions:
+            # Задача, переставшая подходить под фильтр доски, с неё убирается.
+            subscription.send(upsert if subscription.matches(doc) else delete)
+        self.events += 1
+
+    def dispatch_delete(self, task_id, user_id=None):
+        # Событие удаления содержит только _id: владелец берётся из прежнего документа
+        # (PRE_IMAGES) или из задач, которые этот процесс уже отправлял. Остальные удаления
+        # не рассылаются — чужие идентификаторы не уходят клиентам, а пакетное удаление
+        # или перенос в архив не переполняют очереди всех досок.
+        with self._lock:
+            owner = self._owners.pop(task_id, None)
+        user_id = user_id if user_id is not None else owner
+        if user_id is None:
+            return
+        event = {'type': 'delete', 'id': str(task_id)}
+        for subscription in self.subscriptions(user_id):
+            subscription.send(event)
+        self.events += 1
+
+    def dispatch_resync(self, user_id):
+        for subscription in self.subscriptions(user_id):
+            subscription.send({'type': 'resync'})
+        self.events += 1
+
+    def handle_change(self, change):
+        if change['operationType'] == 'delete':
+            before = change.get('fullDocumentBeforeChange') or {}
+            self.dispatch_delete(change['documentKey']['_id'], before.get('user_id'))
+        elif change.get('fullDocument') is not None:
+            self.dispatch_document(change['fullDocument'], created=change['operationType'] == 'insert')
+
+    def run(self):
+        while not self._stop.is_set():
+            if not CHANGE_STREAMS:
+                self.poll_changes()
+                continue
+            try:
+                self.watch_changes()
+            except OperationFailure as exc:
+                if exc.code not in CHANGE_STREAMS_UNSUPPORTED:
+                    self.restart_stream(exc)
+                    continue
+                self.poll_changes()
+            except PyMongoError as exc:
+                logger.warning('Поток изменений прерван: %s', exc)
+                self._stop.wait(self.poll_interval)
+
+    def restart_stream(self, exc):
+        # Возобновляемые ошибки PyMongo обрабатывает сам; дошедшая сюда ошибка (например,
+        # ChangeStreamHistoryLost) повторилась бы с тем же токеном бесконечно. Поток
+        # открывается заново с текущего момента, а пропущенное восстанавливает resync.
+        logger.warning('Поток изменений прерван: %s', exc)
+        self.resume_token = None
+        for user_id in list(self.subscribers):
+            self.dispatch_resync(user_id)
+        self._stop.wait(self.poll_interval)
+
+    def watch_changes(self):
+        collection = Task._get_collection()
+        options = {'full_document_before_change': 'whenAvailable'} if PRE_IMAGES else {}
+        with collection.watch(
+            CHANGE_PIPELINE,
+            full_document='updateLookup',
+            resume_after=self.resume_token,
+            max_await_time_ms=int(self.poll_interval * 1000),
+            **options,
+        ) as stream:
+            self.mode = 'change_stream'
+            while not self._stop.is_set():
+                change = stream.try_next()
+                if change is not None:
+                    self.handle_change(change)
+                self.resume_token = stream.resume_token
+
+    def poll_changes(self):
+        # Standalone MongoDB без потоков изменений: опрос версий досок board_versions.
+        self.mode = 'polling'
+        self._since = datetime.now()
+        self._versions = {}
+        self._counts = {}
+        while not self._stop.is_set():
+            # Проверка флага не зависит от wait(): при poll_interval=0 остановка тоже видна.
+            self._stop.wait(self.poll_interval)
+            if self._stop.is_set():
+                return
+            try:
+                self.poll_once()
+            except PyMongoError as exc:
+                logger.warning('Опрос изменений задач не удался: %s', exc)
+
+    def poll_once(self):
+        with self._lock:
+            user_ids = list(self.subscribers)
+        if not user_ids:
+            return
+
+        # Версия доски меняется при любой записи через приложение, включая удаления, поэтому
+        # каждый опрос читает O(подписанных пользователей) документов по _id, а задачи —
+        # только у пользователей, чья версия изменилась.
+        versions = {
+            doc['_id']: doc.get('version', 0)
+            for doc in BoardVersion._get_collection().find({'_id': {'$in': user_ids}})
+        }
+        changed = [user_id for user_id in user_ids if versions.get(user_id, 0) != self._versions.get(user_id)]
+        for user_id in set(self._versions) - set(user_ids):
+            del self._versions[user_id]
+            self._counts.pop(user_id, None)
+        if not changed:
+            return
+
+        collection = Task._get_collection()
+        for user_id in changed:
+            self._versions[user_id] = versions.get(user_id, 0)
+            # Удаление видно только как уменьшение числа задач; подсчёт идёт по индексу
+            # (user_id, ...) и лишь после записи этого пользователя.
+            count = collection.count_documents({'user_id': user_id})
+            previous = self._counts.get(user_id)
+            self._counts[user_id] = count
+            if previous is not None and count < previous:
+                self.dispatch_resync(user_id)
+
+        since = self._since
+        for doc in collection.find({'user_id': {'$in': changed}, 'updated_at': {'$gte': since}}):
+            created_at = doc.get('created_at')
+            self.dispatch_document(doc, created=created_at is not None and created_at >= since)
+            if doc['updated_at'] > self._since:
+                self._since = doc['updated_at']
+
+    def stats(self):
+        with self._lock:
+            subscriptions = [subscription for group in self.subscribers.values() for subscription in group]
+        return {
+            'subscribers': len(subscriptions),
+            'events_total': self.events,
+        }
+
+
+board_events = BoardEvents()
+
+
+def format_event(event, event_id):
+    return f'id: {event_id}\nevent: {event["type"]}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n'
+
+
+def stream_prelude(resync):
+    yield f'retry: {RETRY_MS}\n\n'
+    if resync:
+        # Переподключение (Last-Event-ID): пропущенные события восстанавливаются перезагрузкой.
+        yield format_event({'type': 'resync'}, 0)
+
+
+def iter_events(subscription, hub=board_events, resync=False):
+    try:
+        yield from stream_prelude(resync)
+        event_id = 0
+        while True:
+            try:
+                event = subscription.queue.get(timeout=HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            event_id += 1
+            yield format_event(event, event_id)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def aiter_events(subscription, hub=board_events, resync=False):
+    try:
+        for chunk in stream_prelude(resync):
+            yield chunk
+        event_id = 0
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            event_id += 1
+            yield format_event(event, event_id)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@metrics.register
+def live_metrics():
+    stats = board_events.stats()
+    return [
+        ('taskmanager_live_subscribers', {}, stats['subscribers']),
+        ('taskmanager_live_events_total', {}, stats['events_total']),
+        ('taskmanager_live_polling', {}, int(board_events.mode == 'polling')),
+    ]
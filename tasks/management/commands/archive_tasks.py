@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.archive import AFTER_DAYS, BATCH_SIZE, PAUSE, archive_tasks
+from tasks.models import ArchivedTask, Task
+
+
+class Command(BaseCommand):
+    help = 'Переносит давно выполненные задачи из tasks в архивную коллекцию tasks_archive.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after-days', type=int, default=AFTER_DAYS,
+                            help='Переносить задачи, выполненные и не менявшиеся столько дней.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=PAUSE,
+                            help='Пауза между пачками, секунд.')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Перенести не больше стольких задач за проход.')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Повторять проход каждые столько секунд (по умолчанию один проход).')
+
+    def handle(self, *args, **options):
+        # Без частичного индекса (status, updated_at) поиск кандидатов читал бы всю коллекцию.
+        Task.ensure_indexes()
+        ArchivedTask.ensure_indexes()
+
+        while True:
+            moved = archive_tasks(
+                after_days=options['after_days'],
+                batch_size=options['batch_size'],
+                pause=options['pause'],
+                limit=options['limit'],
+            )
+            self.stdout.write(self.style.SUCCESS(f'Перенесено в архив: {moved}'))
+            if options['interval'] is None:
+                return
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,102 @@
+import json
+import subprocess
+from datetime import datetime
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+SUITES = {
+    'middleware': 'tasks.benchmarks.middleware',
+    'render': 'tasks.benchmarks.render',
+    'hydration': 'tasks.benchmarks.hydration',
+    'views': 'tasks.benchmarks.views',
+}
+
+# Показатели, где рост означает регрессию; по ним работает --max-regression.
+LATENCY_SUFFIXES = ('p50_ms', 'p95_ms', 'p99_ms', 'median_us')
+
+
+def flatten(results, prefix=''):
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            yield from flatten(value, f'{name}.')
+        else:
+            yield name, value
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+class Command(BaseCommand):
+    help = 'Запускает микробенчмарки и нагрузочные замеры приложения задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suites', nargs='*', help=f'Наборы: {", ".join(SUITES)} (по умолчанию все).')
+        parser.add_argument('--json', dest='json_path', help='Сохранить результаты в JSON-файл.')
+        parser.add_argument('--compare', dest='compare_path', help='Сравнить с результатами из JSON-файла.')
+        parser.add_argument(
+            '--max-regression', type=float,
+            help='Завершиться с ошибкой, если задержка выросла больше чем на столько процентов.',
+        )
+        parser.add_argument('--users', type=int, help='views: число пользователей (по умолчанию 1).')
+        parser.add_argument('--tasks', type=int, help='views: задач на пользователя (по умолчанию 1000).')
+        parser.add_argument('--requests', type=int, help='views: запросов на сценарий (по умолчанию 200).')
+        parser.add_argument('--concurrency', type=int, help='views: параллельных клиентов (по умолчанию 1).')
+        parser.add_argument('--mongomock', action='store_true', help='views: MongoDB в памяти (пакет mongomock).')
+
+    def handle(self, *args, **options):
+        names = options['suites'] or list(SUITES)
+        unknown = [name for name in names if name not in SUITES]
+        if unknown:
+            raise CommandError(f'Неизвестные наборы: {", ".join(unknown)}')
+
+        baseline = None
+        if options['compare_path']:
+            with open(options['compare_path'], encoding='utf-8') as source:
+                baseline = dict(flatten({
+                    name: value for name, value in json.load(source).items() if not name.startswith('_')
+                }))
+
+        results = {}
+        for name in names:
+            results[name] = import_module(SUITES[name]).run(options)
+            for key, value in flatten(results[name], f'{name}.'):
+                self.stdout.write(f'{key}: {value:.2f}' if isinstance(value, float) else f'{key}: {value}')
+
+        if options['json_path']:
+            results['_meta'] = {
+                'commit': git_commit(),
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'options': {key: options[key] for key in ('users', 'tasks', 'requests', 'concurrency', 'mongomock')},
+            }
+            with open(options['json_path'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+
+        if baseline is not None:
+            self.compare(baseline, results, options['max_regression'])
+
+    def compare(self, baseline, results, max_regression):
+        regressions = []
+        self.stdout.write('')
+        for key, value in flatten({name: value for name, value in results.items() if not name.startswith('_')}):
+            before = baseline.get(key)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or not before:
+                continue
+            change = (value - before) / before * 100
+            self.stdout.write(f'{key}: {before:.2f} -> {value:.2f} ({change:+.1f}%)')
+            if max_regression is not None and key.endswith(LATENCY_SUFFIXES) and change > max_regression:
+                regressions.append(f'{key} {change:+.1f}%')
+
+        if regressions:
+            raise CommandError(f'Регрессия больше {max_regression}%: {", ".join(regressions)}')
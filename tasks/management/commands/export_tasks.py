@@ -0,0 +1,40 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.export import EXPORT_BATCH_SIZE, EXPORT_FORMATS, export_documents, iter_export, iter_gzip
+
+
+class Command(BaseCommand):
+    help = 'Выгружает задачи пользователя в CSV или NDJSON потоком, не загружая их в память.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', dest='export_format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='Файл для выгрузки (по умолчанию stdout).')
+        parser.add_argument('--gzip', action='store_true', help='Сжимать выгрузку в gzip.')
+        parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE)
+        parser.add_argument('--no-archived', dest='include_archived', action='store_false',
+                            help='Не выгружать задачи из архива.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {options["username"]} не найден.')
+
+        docs = export_documents(user.id, batch_size=options['batch_size'], include_archived=options['include_archived'])
+        chunks = iter_export(docs, options['export_format'])
+        if options['gzip']:
+            chunks = iter_gzip(chunks)
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
@@ -0,0 +1,47 @@
+import json
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.importer import IMPORT_BATCH_SIZE, IMPORT_FORMATS, detect_format, import_tasks, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Импортирует задачи пользователя из CSV или NDJSON пакетными вставками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='Файл для импорта или «-» для stdin.')
+        parser.add_argument('--format', dest='import_format', choices=IMPORT_FORMATS,
+                            help='Формат файла (по умолчанию по расширению).')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--errors', dest='errors_path', help='Сохранить построчный отчёт об ошибках в JSON-файл.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {options["username"]} не найден.')
+
+        path = options['path']
+        import_format = options['import_format'] or detect_format(path)
+        stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        try:
+            report = import_tasks(user.id, iter_rows(stream, import_format), options['batch_size'])
+        finally:
+            if path != '-':
+                stream.close()
+
+        for item in report.errors:
+            errors = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in item['errors'].items())
+            self.stderr.write(f'Строка {item["line"]}: {errors}')
+
+        if options['errors_path']:
+            with open(options['errors_path'], 'w', encoding='utf-8') as output:
+                json.dump(report.as_dict(), output, ensure_ascii=False, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк: {report.rows}, добавлено: {report.inserted}, с ошибками: {report.failed}, '
+            f'{report.elapsed:.2f} с ({report.rows_per_second:.0f} строк/с)'
+        ))
@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.archive import archivable_queryset
+from tasks.board import PAGE_SIZE, board_queryset, column_queryset, encode_cursor
+from tasks.fragments import latest_update_queryset
+from tasks.models import Task
+from tasks.scheduler import changed_queryset, due_queryset
+from tasks.search import autocomplete_queryset
+
+
+def plan_stages(plan):
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append((plan['stage'], plan.get('indexName')))
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def winning_plan(explain):
+    plans = []
+    if isinstance(explain, dict):
+        if 'winningPlan' in explain:
+            plans.append(explain['winningPlan'])
+        for key, value in explain.items():
+            if key not in ('winningPlan', 'rejectedPlans'):
+                plans.extend(winning_plan(value))
+    elif isinstance(explain, list):
+        for item in explain:
+            plans.extend(winning_plan(item))
+    return plans
+
+
+def explain_queryset(tasks):
+    db = Task._get_db()
+    command = {
+        'find': Task._get_collection_name(),
+        'filter': tasks._query,
+    }
+    ordering = tasks._ordering
+    if ordering is None:
+        ordering = tasks._get_order_by(Task._meta['ordering'])
+    if ordering:
+        command['sort'] = dict(ordering)
+    if tasks._loaded_fields:
+        command['projection'] = tasks._loaded_fields.as_dict()
+    if tasks._limit is not None:
+        command['limit'] = tasks._limit
+    if tasks._hint not in (-1, None):
+        command['hint'] = tasks._hint if isinstance(tasks._hint, str) else dict(tasks._hint)
+    return db.command('explain', command, verbosity='queryPlanner')
+
+
+def explain_pipeline(tasks, pipeline):
+    db = Task._get_db()
+    command = {
+        'aggregate': Task._get_collection_name(),
+        'pipeline': [{'$match': tasks._query}] + pipeline,
+        'cursor': {},
+    }
+    return db.command('explain', command, verbosity='queryPlanner')
+
+
+def query_shapes(user_id):
+    tasks = board_queryset(user_id)
+    by_priority = board_queryset(user_id, priority_filter='2')
+    searched = board_queryset(user_id, search_query='отчёт')
+    cursor = encode_cursor(datetime.now(), ObjectId())
+    now = datetime.now()
+
+    return [
+        ('task_list: счётчики колонок', lambda: explain_pipeline(
+            tasks, [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}])),
+        ('task_list: колонка по статусу', lambda: explain_queryset(
+            column_queryset(tasks, 'in_progress'))),
+        ('task_list: колонка «Сделать»', lambda: explain_queryset(
+            column_queryset(tasks, 'todo'))),
+        ('task_list: фильтр по приоритету', lambda: explain_queryset(
+            column_queryset(by_priority, 'done'))),
+        ('task_list: поиск', lambda: explain_queryset(
+            column_queryset(searched, 'todo'))),
+        ('task_column: следующая страница', lambda: explain_queryset(
+            column_queryset(tasks, 'done', cursor, PAGE_SIZE))),
+        ('task_autocomplete', lambda: explain_queryset(
+            autocomplete_queryset(user_id, 'отч'))),
+        ('task_list: ETag доски', lambda: explain_queryset(
+            latest_update_queryset(user_id))),
+        ('run_scheduler: сроки', lambda: explain_queryset(
+            due_queryset(now - timedelta(days=1), now + timedelta(hours=6)))),
+        ('run_scheduler: изменённые сроки', lambda: explain_queryset(
+            changed_queryset(now - timedelta(minutes=1), now + timedelta(hours=6)))),
+        ('archive_tasks: кандидаты', lambda: explain_queryset(
+            archivable_queryset(now - timedelta(days=30)).limit(500))),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Проверяет планы запросов представлений задач и сообщает об используемых индексах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, default=None,
+                            help='Пользователь, для которого строятся запросы (по умолчанию любой с задачами).')
+        parser.add_argument('--ensure-indexes', action='store_true',
+                            help='Создать индексы, объявленные в Task.meta, перед проверкой.')
+        parser.add_argument('--drop-unused', action='store_true',
+                            help='Удалить индексы коллекции, которых нет в Task.meta.')
+        parser.add_argument('--fail-on-problems', action='store_true',
+                            help='Завершиться с ошибкой, если найден COLLSCAN или сортировка в памяти.')
+
+    def handle(self, *args, **options):
+        collection = Task._get_collection()
+
+        if options['ensure_indexes']:
+            Task.ensure_indexes()
+
+        self.report_index_drift(collection, options['drop_unused'])
+
+        user_id = options['user_id']
+        if user_id is None:
+            sample = collection.find_one({}, {'user_id': 1})
+            user_id = sample['user_id'] if sample else 0
+
+        problems = 0
+        for name, explain in query_shapes(user_id):
+            stages = [stage for plan in winning_plan(explain()) for stage in plan_stages(plan)]
+            indexes = sorted({index for stage, index in stages if index})
+            flags = []
+            if any(stage == 'COLLSCAN' for stage, _ in stages):
+                flags.append('COLLSCAN')
+            if any(stage == 'SORT' for stage, _ in stages):
+                flags.append('IN-MEMORY SORT')
+
+            line = f'{name}: {", ".join(indexes) or "индекс не используется"}'
+            if flags:
+                problems += 1
+                self.stdout.write(self.style.WARNING(f'{line} [{", ".join(flags)}]'))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+
+        if problems and options['fail_on_problems']:
+            raise CommandError(f'Запросов с проблемными планами: {problems}')
+
+    def report_index_drift(self, collection, drop_unused):
+        drift = Task.compare_indexes()
+
+        for spec in drift['missing']:
+            self.stdout.write(self.style.WARNING(f'Не создан индекс: {spec}'))
+
+        extra = {tuple(spec) for spec in drift['extra']}
+        for name, info in collection.index_information().items():
+            if tuple(info['key']) not in extra:
+                continue
+            if drop_unused:
+                collection.drop_index(name)
+                self.stdout.write(f'Удалён неиспользуемый индекс: {name}')
+            else:
+                self.stdout.write(self.style.WARNING(f'Лишний индекс: {name}'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from tasks.fragments import bump_board_version
+from tasks.models import ArchivedTask, Task
+from tasks.text import index_terms
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает поисковые термы (search_terms) задач и архива.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--missing-only', action='store_true',
+                            help='Обработать только задачи без поискового индекса.')
+
+    def handle(self, *args, **options):
+        query = {'search_terms': {'$exists': False}} if options['missing_only'] else {}
+        users = set()
+        for document in (Task, ArchivedTask):
+            updated = self.rebuild(document._get_collection(), query, options['batch_size'], users)
+            self.stdout.write(f'{document._get_collection_name()}: обновлено задач: {updated}')
+
+        # Новая версия доски сбрасывает закэшированные фрагменты поиска во всех процессах.
+        for user_id in users:
+            bump_board_version(user_id)
+        self.stdout.write(self.style.SUCCESS(f'Пользователей со сброшенным кэшем доски: {len(users)}'))
+
+    def rebuild(self, collection, query, batch_size, users):
+        fields = {'title': 1, 'description': 1, 'user_id': 1, 'search_terms': 1}
+        cursor = collection.find(query, fields).batch_size(batch_size)
+
+        batch, updated = [], 0
+        for doc in cursor:
+            terms = index_terms(doc.get('title'), doc.get('description'))
+            if doc.get('search_terms') == terms:
+                continue
+            batch.append(UpdateOne({'_id': doc['_id']}, {'$set': {'search_terms': terms}}))
+            users.add(doc['user_id'])
+            if len(batch) >= batch_size:
+                updated += collection.bulk_write(batch, ordered=False).modified_count
+                batch = []
+        if batch:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+        return updated
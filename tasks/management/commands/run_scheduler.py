@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from tasks.models import Task, TaskNotification
+from tasks.scheduler import BATCH_SIZE, POLL_INTERVAL, ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = 'Записывает напоминания о сроках задач в коллекцию task_notifications.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить один проход и завершиться (для cron).')
+        parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                            help='Наибольшая пауза между проходами, секунд.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        # Без частичного индекса по due_date выборка сроков читала бы всю коллекцию.
+        Task.ensure_indexes()
+        TaskNotification.ensure_indexes()
+
+        scheduler = ReminderScheduler(batch_size=options['batch_size'])
+        if options['once']:
+            created = scheduler.tick()
+            self.stdout.write(self.style.SUCCESS(f'Записано напоминаний: {created}'))
+            return
+
+        self.stdout.write(f'Планировщик напоминаний запущен, пауза до {options["interval"]:g} с. Ctrl+C — остановка.')
+        try:
+            scheduler.run(interval=options['interval'])
+        except KeyboardInterrupt:
+            pass
+        stats = scheduler.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано напоминаний: {stats["notified"]}, повторов: {stats["duplicates"]}'
+        ))
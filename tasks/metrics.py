@@ -0,0 +1,31 @@
+_collectors = []
+
+
+def register(collector):
+    # collector() возвращает последовательность (name, labels, value).
+    _collectors.append(collector)
+    return collector
+
+
+def collect():
+    samples = []
+    for collector in _collectors:
+        samples.extend(collector())
+    return samples
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in sorted(labels.items())
+    )
+    return '{' + pairs + '}'
+
+
+def render_prometheus():
+    return ''.join(
+        f'{name}{format_labels(labels)} {value}\n'
+        for name, labels, value in collect()
+    )
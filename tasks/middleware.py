@@ -1,6 +1,17 @@
 import re
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import HttpResponseBadRequest
 from django.utils.deprecation import MiddlewareMixin
+from .instrumentation import record_request, sample_request
+from .models import user_identity_scope
+from .routing import RECENT_WRITE_SESSION_KEY, recent_write_marker, track_writes
+
+
+SQL_INJECTION_MESSAGE = "Обнаружена попытка SQL-инъекции"
+XSS_MESSAGE = "Обнаружена попытка XSS-атаки"
+
+# Символы, которые re.IGNORECASE считает равными латинским буквам.
+IGNORECASE_EXTRAS = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u212a': 'k', '\u017f': 's'})
 
 
 class SecurityMiddleware(MiddlewareMixin):
@@ -11,7 +22,7 @@ class SecurityMiddleware(MiddlewareMixin):
         r"(OR\s+1\s*=\s*1|AND\s+1\s*=\s*1)",
         r"(\bxp_\w+|\bsp_\w+)",
     ]
-    
+
     XSS_PATTERNS = [
         r"(<script[^>]*>.*?</script>)",
         r"(javascript:)",
@@ -21,26 +32,139 @@ class SecurityMiddleware(MiddlewareMixin):
         r"(<object[^>]*>)",
         r"(<embed[^>]*>)",
     ]
-    
+
+    # Ни один шаблон не совпадёт, если в значении (в нижнем регистре) нет хотя бы
+    # одного из этих литералов. При добавлении шаблона добавьте и его литерал.
+    TRIGGER_LITERALS = [
+        'select', 'union', 'insert', 'update', 'delete', 'drop', 'create', 'alter', 'exec',
+        '--', ';', '/*', '*/',
+        "'", '"', '`',
+        '=',
+        'xp_', 'sp_',
+        '<script', 'javascript:', 'onerror', 'onload', '<iframe', '<object', '<embed',
+    ]
+
+    SQL_INJECTION_RES = [re.compile(pattern, re.IGNORECASE) for pattern in SQL_INJECTION_PATTERNS]
+    XSS_RES = [re.compile(pattern, re.IGNORECASE) for pattern in XSS_PATTERNS]
+    TRIGGER_RE = re.compile('|'.join(re.escape(literal) for literal in TRIGGER_LITERALS))
+
     def process_request(self, request):
         if request.method == 'POST':
             for key, value in request.POST.items():
-                if isinstance(value, str):
-                    if self._contains_sql_injection(value):
-                        return HttpResponseBadRequest("Обнаружена попытка SQL-инъекции")
-                    if self._contains_xss(value):
-                        return HttpResponseBadRequest("Обнаружена попытка XSS-атаки")
+                message = scan_value(value)
+                if message:
+                    return HttpResponseBadRequest(message)
         return None
-    
+
+    async def __acall__(self, request):
+        # Проверка не выполняет ввода-вывода (тело запроса ASGI уже прочитано),
+        # поэтому не переносится в синхронный поток, как в MiddlewareMixin.
+        response = self.process_request(request)
+        return response or await self.get_response(request)
+
     def _contains_sql_injection(self, value):
-        for pattern in self.SQL_INJECTION_PATTERNS:
-            if re.search(pattern, value, re.IGNORECASE):
-                return True
-        return False
-    
+        return any(pattern.search(value) for pattern in self.SQL_INJECTION_RES)
+
     def _contains_xss(self, value):
-        for pattern in self.XSS_PATTERNS:
-            if re.search(pattern, value, re.IGNORECASE):
-                return True
-        return False
+        return any(pattern.search(value) for pattern in self.XSS_RES)
+
+
+def _fold_case(value):
+    if not value.isascii() and any(char in value for char in '\u0130\u0131\u212a\u017f'):
+        value = value.translate(IGNORECASE_EXTRAS)
+    return value.lower()
+
+
+def scan_value(value):
+    if not isinstance(value, str):
+        return None
+
+    # Один проход по значению отсекает обычный текст; точные шаблоны
+    # проверяются только если найден литерал-триггер.
+    if SecurityMiddleware.TRIGGER_RE.search(_fold_case(value)) is None:
+        return None
+
+    if any(pattern.search(value) for pattern in SecurityMiddleware.SQL_INJECTION_RES):
+        return SQL_INJECTION_MESSAGE
+    if any(pattern.search(value) for pattern in SecurityMiddleware.XSS_RES):
+        return XSS_MESSAGE
+    return None
+
+
+class RequestTimingMiddleware:
+    # Стоит первым в MIDDLEWARE, чтобы учесть запросы сессий и аутентификации.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = sample_request()
+        if timings is None:
+            return self.get_response(request)
+        request.timings = timings
+        with timings.active():
+            response = self.get_response(request)
+        return record_request(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = sample_request()
+        if timings is None:
+            return await self.get_response(request)
+        request.timings = timings
+        with timings.active():
+            response = await self.get_response(request)
+        return record_request(request, response, timings)
+
+
+class UserIdentityMapMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with user_identity_scope():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with user_identity_scope():
+            return await self.get_response(request)
+
+
+class RecentWriteMiddleware:
+    # Запоминает в сессии время последней записи, чтобы следующие чтения
+    # (редирект после создания или правки) шли на primary, а не на реплику.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with track_writes() as writes:
+            response = self.get_response(request)
+        if writes:
+            request.session[RECENT_WRITE_SESSION_KEY] = recent_write_marker()
+        return response
 
+    async def __acall__(self, request):
+        with track_writes() as writes:
+            response = await self.get_response(request)
+        if writes:
+            await request.session.aset(RECENT_WRITE_SESSION_KEY, recent_write_marker())
+        return response
@@ -1,9 +1,54 @@
-from mongoengine import Document, StringField, DateTimeField, BooleanField, IntField
-from datetime import datetime
+from mongoengine import Document, StringField, DateTimeField, BooleanField, IntField, ListField, ObjectIdField
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from django.contrib.auth.models import User
+from .signals import task_changed
+from .text import index_terms
 
 
-class Task(Document):
+_user_identity_map = ContextVar('task_user_identity_map', default=None)
+_missing = object()
+
+
+@contextmanager
+def user_identity_scope():
+    token = _user_identity_map.set({})
+    try:
+        yield
+    finally:
+        _user_identity_map.reset(token)
+
+
+def resolve_users(user_ids):
+    identity_map = _user_identity_map.get()
+    if identity_map is None:
+        identity_map = {}
+    
+    missing = {user_id for user_id in user_ids if user_id not in identity_map}
+    if missing:
+        found = User.objects.in_bulk(missing)
+        for user_id in missing:
+            identity_map[user_id] = found.get(user_id)
+    
+    return identity_map
+
+
+def utc_now():
+    # Срок из формы приходит с часовым поясом, и PyMongo хранит его как наивное UTC
+    # (клиент без tz_aware). Сравнивать due_date нужно с этим временем, а не с datetime.now().
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# Невыполненная задача — completed: False. Переключение меняет только completed, статус
+# остаётся прежним, поэтому просроченные задачи и напоминания определяются по этому полю.
+OPEN_TASK_FILTER = {'completed': False}
+# Запрос должен содержать эти условия дословно, иначе MongoDB не выберет частичный индекс.
+DUE_TASKS_FILTER = dict(OPEN_TASK_FILTER, due_date={'$type': 'date'})
+ARCHIVABLE_FILTER = {'status': 'done', 'completed': True}
+
+
+class TaskFields(Document):
     title = StringField(required=True, max_length=200)
     description = StringField(max_length=1000)
     completed = BooleanField(default=False)
@@ -13,11 +58,28 @@ class Task(Document):
     created_at = DateTimeField(default=datetime.now)
     updated_at = DateTimeField(default=datetime.now)
     due_date = DateTimeField(null=True)
+    search_terms = ListField(StringField())
     
+    meta = {'abstract': True}
+
+
+class Task(TaskFields):
     meta = {
         'collection': 'tasks',
-        'ordering': ['-created_at'],
-        'indexes': ['title', 'completed', 'status', 'priority', 'created_at', 'user_id']
+        'ordering': ['-created_at', '-id'],
+        'indexes': [
+            ('user_id', 'status', '-created_at', '-id'),
+            ('user_id', 'priority', '-created_at', '-id'),
+            ('user_id', '-created_at', '-id'),
+            ('user_id', 'search_terms', '-created_at', '-id'),
+            ('user_id', '-updated_at'),
+            # Частичные индексы планировщика напоминаний: только невыполненные задачи
+            # со сроком, поэтому выборка сроков не зависит от общего числа задач.
+            {'fields': ['due_date'], 'partialFilterExpression': DUE_TASKS_FILTER},
+            {'fields': ['updated_at'], 'partialFilterExpression': DUE_TASKS_FILTER},
+            # Кандидаты на перенос в архив: индекс содержит только выполненные задачи.
+            {'fields': ['status', 'updated_at'], 'partialFilterExpression': ARCHIVABLE_FILTER},
+        ]
     }
     
     def __str__(self):
@@ -25,11 +87,76 @@ class Task(Document):
     
     @property
     def user(self):
-        try:
-            return User.objects.get(id=self.user_id)
-        except User.DoesNotExist:
-            return None
+        user = self.__dict__.get('_user', _missing)
+        if user is _missing:
+            user = resolve_users([self.user_id])[self.user_id]
+            self._user = user
+        return user
+    
+    @classmethod
+    def attach_users(cls, tasks):
+        tasks = list(tasks)
+        users = resolve_users({task.user_id for task in tasks})
+        for task in tasks:
+            task._user = users[task.user_id]
+        return tasks
     
     def save(self, *args, **kwargs):
         self.updated_at = datetime.now()
-        return super().save(*args, **kwargs)
+        self.search_terms = index_terms(self.title, self.description)
+        result = super().save(*args, **kwargs)
+        task_changed.send(sender=Task, user_id=self.user_id)
+        return result
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        task_changed.send(sender=Task, user_id=self.user_id)
+        return result
+
+
+class ArchivedTask(TaskFields):
+    # Холодное хранилище выполненных задач: индексы горячей коллекции tasks не растут
+    # от истории. Документ сохраняет _id задачи; запись идёт только через tasks.archive.
+    archived_at = DateTimeField(default=datetime.now)
+    
+    meta = {
+        'collection': 'tasks_archive',
+        'ordering': ['-created_at', '-id'],
+        'indexes': [
+            ('user_id', '-created_at', '-id'),
+            ('user_id', 'search_terms', '-created_at', '-id'),
+        ]
+    }
+    
+    def __str__(self):
+        return self.title
+
+
+class BoardVersion(Document):
+    # Счётчик записей задач пользователя: часть ETag и ключа кэша доски во всех процессах.
+    user_id = IntField(primary_key=True)
+    version = IntField(default=0)
+    
+    meta = {'collection': 'board_versions'}
+
+
+class TaskNotification(Document):
+    # Исходящие напоминания: планировщик пишет, отправитель выбирает неотправленные.
+    task_id = ObjectIdField(required=True)
+    user_id = IntField(required=True)
+    kind = StringField(required=True, choices=['due_soon', 'overdue'])
+    title = StringField()
+    due_date = DateTimeField(required=True)
+    created_at = DateTimeField(default=datetime.now)
+    sent_at = DateTimeField(null=True)
+    
+    meta = {
+        'collection': 'task_notifications',
+        'ordering': ['created_at'],
+        'indexes': [
+            # Повторный проход (перезапуск, пересечение окон) не создаёт дубликатов;
+            # новый срок задачи — новое напоминание.
+            {'fields': ['task_id', 'kind', 'due_date'], 'unique': True},
+            ('sent_at', 'created_at'),
+        ]
+    }
@@ -0,0 +1,225 @@
+from datetime import datetime
+
+from bson import ObjectId
+from django.core.exceptions import ValidationError
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .archive import drop_archive_copies
+from .forms import TaskForm
+from .middleware import scan_value
+from .models import Task
+from .readmodel import TaskRow, first_task_row
+from .signals import task_changed
+from .text import index_terms
+
+
+MAX_BULK_OPERATIONS = 500
+BULK_OPS = ('create', 'update', 'move', 'delete')
+
+
+def parse_task_id(task_id):
+    if isinstance(task_id, ObjectId):
+        return task_id
+    if isinstance(task_id, str) and ObjectId.is_valid(task_id):
+        return ObjectId(task_id)
+    return None
+
+
+def clean_task_data(data, partial=False):
+    if not isinstance(data, dict):
+        return None, {'__all__': ['Ожидается объект с полями задачи.']}
+
+    form = TaskForm(data)
+    if partial:
+        cleaned, errors = {}, {}
+        for name, value in data.items():
+            field = form.fields.get(name)
+            if field is None:
+                errors[name] = ['Неизвестное поле.']
+                continue
+            try:
+                cleaned[name] = field.clean(value)
+            except ValidationError as exc:
+                errors[name] = exc.messages
+    elif form.is_valid():
+        cleaned, errors = form.cleaned_data, {}
+    else:
+        cleaned, errors = None, {name: list(messages) for name, messages in form.errors.items()}
+
+    for name, value in data.items():
+        message = scan_value(value)
+        if message:
+            errors.setdefault(name, []).append(message)
+
+    if errors:
+        return None, errors
+    return cleaned, {}
+
+
+def task_fields(cleaned_data):
+    fields = {}
+    if 'title' in cleaned_data:
+        fields['title'] = cleaned_data['title']
+    if 'description' in cleaned_data:
+        fields['description'] = cleaned_data['description']
+    if 'status' in cleaned_data:
+        fields['status'] = cleaned_data['status']
+        fields['completed'] = cleaned_data['status'] == 'done'
+    if 'priority' in cleaned_data:
+        fields['priority'] = int(cleaned_data['priority'])
+    if 'due_date' in cleaned_data:
+        fields['due_date'] = cleaned_data['due_date']
+    fields['updated_at'] = datetime.now()
+    return fields
+
+
+def new_task_document(user_id, cleaned_data):
+    task = Task(user_id=user_id, **task_fields(cleaned_data))
+    task.search_terms = index_terms(task.title, task.description)
+    task.validate()
+    document = task.to_mongo().to_dict()
+    document['_id'] = ObjectId()
+    return document
+
+
+def get_owned_task(task_id, user_id, fields=None):
+    task_id = parse_task_id(task_id)
+    if task_id is None:
+        return None
+    fields = ('id',) + tuple(fields) if fields else TaskRow.FIELDS
+    return first_task_row(Task.objects(id=task_id, user_id=user_id).order_by(), fields)
+
+
+def update_task(task_id, user_id, cleaned_data):
+    task_id = parse_task_id(task_id)
+    if task_id is None:
+        return False
+
+    fields = task_fields(cleaned_data)
+    fields['search_terms'] = index_terms(fields.get('title'), fields.get('description'))
+    result = Task._get_collection().update_one({'_id': task_id, 'user_id': user_id}, {'$set': fields})
+    if result.matched_count:
+        task_changed.send(sender=Task, user_id=user_id)
+    return result.matched_count == 1
+
+
+def toggle_task(task_id, user_id):
+    task_id = parse_task_id(task_id)
+    if task_id is None:
+        return None
+
+    # Инверсия выполняется на сервере, поэтому два одновременных клика
+    # дают два переключения, а не потерянное обновление.
+    document = Task._get_collection().find_one_and_update(
+        {'_id': task_id, 'user_id': user_id},
+        [{'$set': {'completed': {'$not': ['$completed']}, 'updated_at': datetime.now()}}],
+        projection={'completed': 1, 'status': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if document is not None:
+        task_changed.send(sender=Task, user_id=user_id)
+    return document
+
+
+def delete_task(task_id, user_id):
+    task_id = parse_task_id(task_id)
+    if task_id is None:
+        return False
+
+    result = Task._get_collection().delete_one({'_id': task_id, 'user_id': user_id})
+    if result.deleted_count:
+        drop_archive_copies([task_id], user_id)
+        task_changed.send(sender=Task, user_id=user_id)
+    return result.deleted_count == 1
+
+
+def bulk_apply(user_id, operations):
+    results = [None] * len(operations)
+    planned = []
+
+    for index, item in enumerate(operations):
+        op = item.get('op') if isinstance(item, dict) else None
+        if op not in BULK_OPS:
+            results[index] = {'index': index, 'ok': False, 'errors': {'op': ['Неизвестная операция.']}}
+            continue
+
+        if op == 'create':
+            cleaned, errors = clean_task_data(item.get('fields'))
+            if errors:
+                results[index] = {'index': index, 'op': op, 'ok': False, 'errors': errors}
+            else:
+                planned.append((index, op, None, cleaned))
+            continue
+
+        task_id = parse_task_id(item.get('id'))
+        if task_id is None:
+            results[index] = {'index': index, 'op': op, 'ok': False, 'errors': {'id': ['Некорректный идентификатор.']}}
+            continue
+
+        cleaned = {}
+        if op == 'update':
+            cleaned, errors = clean_task_data(item.get('fields'), partial=True)
+        elif op == 'move':
+            cleaned, errors = clean_task_data({'status': item.get('status')}, partial=True)
+        else:
+            errors = {}
+        if errors:
+            results[index] = {'index': index, 'op': op, 'id': str(task_id), 'ok': False, 'errors': errors}
+        else:
+            planned.append((index, op, task_id, cleaned))
+
+    collection = Task._get_collection()
+
+    # Единственная проверка владельца на весь пакет; заодно читаются поля,
+    # нужные для пересчёта поискового индекса при частичном обновлении.
+    ids = list({task_id for _, _, task_id, _ in planned if task_id is not None})
+    owned = {}
+    if ids:
+        cursor = collection.find({'_id': {'$in': ids}, 'user_id': user_id}, {'title': 1, 'description': 1})
+        owned = {doc['_id']: doc for doc in cursor}
+
+    requests, request_indexes = [], []
+    for index, op, task_id, cleaned in planned:
+        if op == 'create':
+            document = new_task_document(user_id, cleaned)
+            requests.append(InsertOne(document))
+            results[index] = {'index': index, 'op': op, 'id': str(document['_id']), 'ok': True}
+        elif task_id not in owned:
+            results[index] = {'index': index, 'op': op, 'id': str(task_id), 'ok': False, 'errors': {'id': ['Задача не найдена.']}}
+            continue
+        elif op == 'delete':
+            requests.append(DeleteOne({'_id': task_id, 'user_id': user_id}))
+            results[index] = {'index': index, 'op': op, 'id': str(task_id), 'ok': True}
+        else:
+            fields = task_fields(cleaned)
+            if 'title' in fields or 'description' in fields:
+                current = owned[task_id]
+                fields['search_terms'] = index_terms(
+                    fields.get('title', current.get('title')),
+                    fields.get('description', current.get('description'))
+                )
+            requests.append(UpdateOne({'_id': task_id, 'user_id': user_id}, {'$set': fields}))
+            results[index] = {'index': index, 'op': op, 'id': str(task_id), 'ok': True}
+        request_indexes.append(index)
+
+    summary = {'inserted': 0, 'modified': 0, 'deleted': 0}
+    if requests:
+        try:
+            outcome = collection.bulk_write(requests, ordered=False)
+            details = outcome.bulk_api_result
+        except BulkWriteError as exc:
+            details = exc.details
+            for error in details.get('writeErrors', []):
+                index = request_indexes[error['index']]
+                results[index].update({'ok': False, 'errors': {'__all__': [error.get('errmsg', '')]}})
+        summary = {
+            'inserted': details.get('nInserted', 0),
+            'modified': details.get('nModified', 0),
+            'deleted': details.get('nRemoved', 0),
+        }
+        deleted = [task_id for _, op, task_id, _ in planned if op == 'delete' and task_id in owned]
+        if deleted:
+            drop_archive_copies(deleted, user_id)
+        task_changed.send(sender=Task, user_id=user_id)
+    return results, summary
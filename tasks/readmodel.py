@@ -0,0 +1,43 @@
+# Значения по умолчанию полей Task для документов, где поле не записано.
+DEFAULTS = {
+    'title': '',
+    'description': None,
+    'completed': False,
+    'status': 'todo',
+    'priority': 0,
+    'user_id': None,
+    'created_at': None,
+    'updated_at': None,
+    'due_date': None,
+}
+
+
+class TaskRow:
+    # Задача только для чтения: атрибуты из словаря as_pymongo() без дескрипторов
+    # и отслеживания изменений Document. Поля вне проекции не заполняются, и
+    # обращение к ним даёт AttributeError вместо молча подставленного значения.
+    __slots__ = ('id',) + tuple(DEFAULTS)
+
+    FIELDS = __slots__
+
+    def __init__(self, doc, fields=FIELDS):
+        self.id = doc['_id']
+        for name in fields:
+            if name != 'id':
+                setattr(self, name, doc.get(name, DEFAULTS[name]))
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.title
+
+    def __repr__(self):
+        return f'<TaskRow {self.id}>'
+
+
+def first_task_row(queryset, fields=TaskRow.FIELDS):
+    # Проекция на стороне MongoDB: description и search_terms не передаются, если не нужны.
+    doc = queryset.only(*fields).as_pymongo().first()
+    return TaskRow(doc, fields) if doc is not None else None
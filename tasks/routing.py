@@ -0,0 +1,106 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.dispatch import receiver
+
+from .connection import READ_PREFERENCES
+from .signals import task_changed
+
+
+RECENT_WRITE_SESSION_KEY = 'tasks_recent_write_until'
+
+_replica_reads = ContextVar('tasks_replica_reads', default=False)
+_request_writes = ContextVar('tasks_request_writes', default=None)
+
+
+def replica_read_preference():
+    name = settings.MONGODB.get('REPLICA_READ_PREFERENCE') or 'primary'
+    if name == 'primary':
+        return None
+    if name not in READ_PREFERENCES:
+        raise ValueError(f'Неизвестный MONGODB REPLICA_READ_PREFERENCE: {name}')
+    max_staleness = settings.MONGODB.get('MAX_STALENESS_SECONDS')
+    return type(READ_PREFERENCES[name])(max_staleness=-1 if max_staleness is None else max_staleness)
+
+
+def current_read_preference():
+    return replica_read_preference() if _replica_reads.get() else None
+
+
+def read_source():
+    # Метка для ключей кэша: результат чтения с реплики не отдаётся читающим с primary.
+    return 'primary' if current_read_preference() is None else 'replica'
+
+
+def routed(queryset):
+    # Вне allow_replica_reads (записи, выгрузка, команды) запрос остаётся на primary.
+    preference = current_read_preference()
+    return queryset if preference is None else queryset.read_preference(preference)
+
+
+def routed_collection(document):
+    collection = document._get_collection()
+    preference = current_read_preference()
+    return collection if preference is None else collection.with_options(read_preference=preference)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def wrote_recently(marker):
+    return marker is not None and marker > time.time()
+
+
+def recent_write_marker():
+    # Окно не короче допустимого отставания реплики: после своей записи
+    # пользователь читает с primary, пока реплика может её не содержать.
+    window = settings.MONGODB.get('RECENT_WRITE_SECONDS')
+    if window is None:
+        window = settings.MONGODB.get('MAX_STALENESS_SECONDS') or 0
+    return time.time() + window
+
+
+def allow_replica_reads(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            recent = wrote_recently(await request.session.aget(RECENT_WRITE_SESSION_KEY))
+            with replica_reads(not recent):
+                return await view_func(request, *args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        recent = wrote_recently(request.session.get(RECENT_WRITE_SESSION_KEY))
+        with replica_reads(not recent):
+            return view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def track_writes():
+    writes = []
+    token = _request_writes.set(writes)
+    try:
+        yield writes
+    finally:
+        _request_writes.reset(token)
+
+
+@receiver(task_changed)
+def note_request_write(sender, user_id, **kwargs):
+    writes = _request_writes.get()
+    if writes is not None:
+        writes.append(user_id)
@@ -0,0 +1,207 @@
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .models import DUE_TASKS_FILTER, Task, TaskNotification, utc_now
+
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_CONFIG = getattr(settings, 'TASK_SCHEDULER', {})
+# За сколько секунд до срока отправляется напоминание «скоро срок».
+LEAD_TIME = SCHEDULER_CONFIG.get('LEAD_TIME', 3600)
+# Сроки в пределах HORIZON секунд держатся в куче; дальние подгружаются по мере приближения.
+HORIZON = SCHEDULER_CONFIG.get('HORIZON', 6 * 3600)
+# При запуске просроченные не раньше CATCH_UP секунд назад задачи получают напоминание.
+CATCH_UP = SCHEDULER_CONFIG.get('CATCH_UP', 24 * 3600)
+POLL_INTERVAL = SCHEDULER_CONFIG.get('POLL_INTERVAL', 30.0)
+BATCH_SIZE = SCHEDULER_CONFIG.get('BATCH_SIZE', 500)
+
+# Запись, начатая до прошлого обновления и завершённая после него, не теряется.
+REFRESH_OVERLAP = timedelta(seconds=5)
+DUE_FIELDS = ('user_id', 'title', 'due_date')
+DUPLICATE_KEY = 11000
+
+
+def due_condition(**bounds):
+    # $type из DUE_TASKS_FILTER остаётся в условии: так запрос покрывается частичным индексом.
+    return dict(DUE_TASKS_FILTER['due_date'], **bounds)
+
+
+def due_queryset(start, end):
+    bounds = {'$lte': end}
+    if start is not None:
+        bounds['$gt'] = start
+    query = dict(DUE_TASKS_FILTER, due_date=due_condition(**bounds))
+    return Task.objects(__raw__=query).order_by('due_date').only(*DUE_FIELDS)
+
+
+def changed_queryset(since, end):
+    # Задачи, у которых с прошлого прохода появился или сдвинулся срок (или сняли отметку
+    # о выполнении). Подсказка фиксирует индекс по updated_at: выборка растёт с числом
+    # изменений, а не с числом просроченных задач.
+    query = dict(DUE_TASKS_FILTER, due_date=due_condition(**{'$lte': end}), updated_at={'$gt': since})
+    return Task.objects(__raw__=query).order_by('updated_at').hint([('updated_at', 1)]).only(*DUE_FIELDS)
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ReminderScheduler:
+    # Куча (время срабатывания, задача, вид, срок) с ближайшими сроками. Запись в куче
+    # не удаляется при изменении задачи: перед отправкой задача перечитывается по _id,
+    # и устаревшие записи (срок сдвинут, задача выполнена или удалена) пропускаются.
+    # clock — наивное UTC, как хранится due_date; local_clock — локальное время, как
+    # updated_at и created_at, которые пишутся через datetime.now().
+    def __init__(self, lead_time=LEAD_TIME, horizon=HORIZON, catch_up=CATCH_UP,
+                 batch_size=BATCH_SIZE, clock=utc_now, local_clock=datetime.now):
+        self.lead_time = timedelta(seconds=lead_time)
+        self.horizon = timedelta(seconds=horizon)
+        self.catch_up = timedelta(seconds=catch_up)
+        self.batch_size = batch_size
+        self.clock = clock
+        self.local_clock = local_clock
+        self._heap = []
+        self._scheduled = {}
+        self.horizon_until = None
+        self.refreshed_at = None
+        self.loaded = 0
+        self.refreshed = 0
+        self.stale = 0
+        self.notified = 0
+        self.duplicates = 0
+
+    def schedule(self, doc, now):
+        task_id, due_date = doc['_id'], doc['due_date']
+        if self._scheduled.get(task_id) == due_date:
+            return
+        self._scheduled[task_id] = due_date
+        if due_date > now:
+            heapq.heappush(self._heap, (due_date - self.lead_time, task_id, 'due_soon', due_date))
+        heapq.heappush(self._heap, (due_date, task_id, 'overdue', due_date))
+
+    def load(self, start, end, now):
+        count = 0
+        for doc in due_queryset(start, end).as_pymongo().batch_size(self.batch_size):
+            self.schedule(doc, now)
+            count += 1
+        self.loaded += count
+        return count
+
+    def start(self, now):
+        self.horizon_until = now + self.horizon
+        self.refreshed_at = self.local_clock()
+        self.load(now - self.catch_up, self.horizon_until, now)
+
+    def refresh(self, now):
+        since = self.refreshed_at - REFRESH_OVERLAP
+        self.refreshed_at = self.local_clock()
+        for doc in changed_queryset(since, self.horizon_until).as_pymongo().batch_size(self.batch_size):
+            self.schedule(doc, now)
+            self.refreshed += 1
+
+    def extend(self, now):
+        # Горизонт сдвигается порциями: читаются только сроки из нового отрезка.
+        if self.horizon_until - now > self.horizon / 2:
+            return
+        until = now + self.horizon
+        self.load(self.horizon_until, until, now)
+        self.horizon_until = until
+
+    def pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap))
+        return due
+
+    def fire(self, now):
+        due = self.pop_due(now)
+        try:
+            return sum(self.notify(batch, now) for batch in chunks(due, self.batch_size))
+        except PyMongoError:
+            # Записи возвращаются в кучу; уже записанные напоминания отсечёт уникальный индекс.
+            for entry in due:
+                heapq.heappush(self._heap, entry)
+            raise
+
+    def notify(self, batch, now):
+        ids = list({entry[1] for entry in batch})
+        current = {
+            doc['_id']: doc for doc in Task.objects(
+                __raw__=dict(DUE_TASKS_FILTER, _id={'$in': ids})
+            ).order_by().only(*DUE_FIELDS).as_pymongo()
+        }
+        notifications = []
+        for _, task_id, kind, due_date in batch:
+            if kind == 'overdue' and self._scheduled.get(task_id) == due_date:
+                del self._scheduled[task_id]
+            doc = current.get(task_id)
+            if doc is None or doc['due_date'] != due_date or (kind == 'due_soon' and now >= due_date):
+                self.stale += 1
+                continue
+            notifications.append({
+                'task_id': task_id,
+                'user_id': doc['user_id'],
+                'kind': kind,
+                'title': doc.get('title'),
+                'due_date': due_date,
+                'created_at': self.local_clock(),
+                'sent_at': None,
+            })
+        return self.write(notifications)
+
+    def write(self, notifications):
+        if not notifications:
+            return 0
+        try:
+            inserted = len(TaskNotification._get_collection().insert_many(notifications, ordered=False).inserted_ids)
+        except BulkWriteError as exc:
+            errors = exc.details.get('writeErrors', [])
+            if any(error['code'] != DUPLICATE_KEY for error in errors):
+                raise
+            self.duplicates += len(errors)
+            inserted = exc.details.get('nInserted', 0)
+        self.notified += inserted
+        return inserted
+
+    def tick(self):
+        now = self.clock()
+        if self.horizon_until is None:
+            self.start(now)
+        else:
+            self.refresh(now)
+            self.extend(now)
+        return self.fire(now)
+
+    def next_wakeup(self, interval):
+        if not self._heap:
+            return interval
+        return max(0.0, min(interval, (self._heap[0][0] - self.clock()).total_seconds()))
+
+    def run(self, stop=None, interval=POLL_INTERVAL):
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.tick()
+            except PyMongoError as exc:
+                logger.warning('Проход планировщика напоминаний не удался: %s', exc)
+                stop.wait(interval)
+                continue
+            stop.wait(self.next_wakeup(interval))
+
+    def stats(self):
+        return {
+            'scheduled': len(self._heap),
+            'tasks': len(self._scheduled),
+            'loaded': self.loaded,
+            'refreshed': self.refreshed,
+            'stale': self.stale,
+            'notified': self.notified,
+            'duplicates': self.duplicates,
+        }
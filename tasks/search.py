@@ -0,0 +1,58 @@
+from .aio import fetch
+from .models import Task
+from .routing import routed
+from .text import normalize, query_terms, tokenize
+
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_CANDIDATES = 50
+
+
+def search_filter(tasks, query):
+    terms = query_terms(query)
+    if not terms:
+        return tasks.none()
+    return tasks.filter(search_terms__all=terms)
+
+
+def rank_title(title, query):
+    normalized_title = normalize(title)
+    normalized_query = normalize(query).strip()
+
+    if normalized_title == normalized_query:
+        return 3
+    if normalized_title.startswith(normalized_query):
+        return 2
+
+    words = tokenize(title)
+    if all(any(word.startswith(term) for word in words) for term in query_terms(query)):
+        return 1
+    return 0
+
+
+def autocomplete_queryset(user_id, query):
+    tasks = search_filter(routed(Task.objects(user_id=user_id)), query)
+    return tasks.only('title').limit(AUTOCOMPLETE_CANDIDATES)
+
+
+def autocomplete(user_id, query, limit=AUTOCOMPLETE_LIMIT):
+    titles = [doc['title'] for doc in autocomplete_queryset(user_id, query).as_pymongo()]
+    return rank_suggestions(titles, query, limit)
+
+
+async def aautocomplete(user_id, query, limit=AUTOCOMPLETE_LIMIT):
+    titles = [doc['title'] for doc in await fetch(autocomplete_queryset(user_id, query))]
+    return rank_suggestions(titles, query, limit)
+
+
+def rank_suggestions(titles, query, limit=AUTOCOMPLETE_LIMIT):
+    # sorted() устойчив, поэтому при равном ранге сохраняется порядок по дате создания.
+    ranked = sorted(titles, key=lambda title: -rank_title(title, query))
+
+    suggestions = []
+    for title in ranked:
+        if title not in suggestions:
+            suggestions.append(title)
+        if len(suggestions) == limit:
+            break
+    return suggestions
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+
+# Отправляется после любой записи задач пользователя (kwargs: user_id).
+task_changed = Signal()
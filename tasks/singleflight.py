@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from django.dispatch import receiver
+
+from . import metrics
+from .routing import current_read_preference
+from .signals import task_changed
+
+
+SINGLE_FLIGHT_CONFIG = getattr(settings, 'TASK_SINGLE_FLIGHT', {})
+# Сколько секунд готовый результат отдаётся повторным запросам без обращения к MongoDB.
+WINDOW = SINGLE_FLIGHT_CONFIG.get('WINDOW', 0.3)
+ENABLED = SINGLE_FLIGHT_CONFIG.get('ENABLED', True)
+
+
+def flight_key(user_id, kind, *params):
+    # Чтение с реплики и с primary не объединяются: после своей записи нужен primary.
+    return (user_id, kind, current_read_preference() is not None) + params
+
+
+class Flight:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # (цикл, Future) асинхронных ожидающих: лидер может работать в другом потоке.
+        self.waiters = []
+
+
+def resolve(future, result, error):
+    if future.done():
+        return
+    if isinstance(error, asyncio.CancelledError):
+        future.cancel()
+    elif error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class SingleFlight:
+    # Одинаковые одновременные запросы (ключ flight_key) выполняют один запрос к MongoDB:
+    # первый вызов становится лидером, остальные ждут и получают тот же результат.
+    def __init__(self, window=WINDOW, enabled=ENABLED, clock=time.monotonic):
+        self.window = window
+        self.enabled = enabled
+        self.clock = clock
+        self._flights = {}
+        self._results = {}
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def count(self, kind, name):
+        counts = self._counts.setdefault(kind, {'executed': 0, 'shared': 0, 'window_hits': 0})
+        counts[name] += 1
+
+    def join(self, key, window):
+        # Под блокировкой: (результат из окна, рейс, лидер ли вызывающий).
+        kind = key[1]
+        if window:
+            cached = self._results.get(key)
+            if cached is not None:
+                if cached[1] > self.clock():
+                    self.count(kind, 'window_hits')
+                    return cached, None, False
+                del self._results[key]
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.count(kind, 'shared')
+            return None, flight, False
+        flight = self._flights[key] = Flight()
+        self.count(kind, 'executed')
+        return None, flight, True
+
+    def finish(self, key, flight, window, result=None, error=None):
+        with self._lock:
+            # forget() мог отвязать рейс: его результат уже устарел для новых запросов.
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+                if window and error is None:
+                    self._results[key] = (result, self.clock() + window)
+            flight.result = result
+            flight.error = error
+            flight.done.set()
+            waiters, flight.waiters = flight.waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(resolve, future, result, error)
+            except RuntimeError:  # цикл ожидающего запроса уже закрыт
+                pass
+
+    def do(self, key, func, window=None):
+        if not self.enabled:
+            return func()
+        window = self.window if window is None else window
+        with self._lock:
+            cached, flight, leader = self.join(key, window)
+        if cached is not None:
+            return cached[0]
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            result = func()
+        except BaseException as exc:
+            self.finish(key, flight, window, error=exc)
+            raise
+        self.finish(key, flight, window, result)
+        return result
+
+    async def ado(self, key, func, window=None):
+        if not self.enabled:
+            return await func()
+        window = self.window if window is None else window
+        with self._lock:
+            cached, flight, leader = self.join(key, window)
+            if flight is not None and not leader:
+                future = asyncio.get_running_loop().create_future()
+                flight.waiters.append((future.get_loop(), future))
+        if cached is not None:
+            return cached[0]
+
+        if not leader:
+            # У каждого ожидающего своя Future: его отмена не затрагивает остальных.
+            return await future
+
+        try:
+            result = await func()
+        except BaseException as exc:
+            self.finish(key, flight, window, error=exc)
+            raise
+        self.finish(key, flight, window, result)
+        return result
+
+    def forget(self, user_id):
+        # После записи новые запросы не присоединяются к начатым до неё и не читают окно.
+        with self._lock:
+            for store in (self._flights, self._results):
+                for key in [key for key in store if key[0] == user_id]:
+                    del store[key]
+
+    def clear(self):
+        with self._lock:
+            self._flights.clear()
+            self._results.clear()
+
+    def stats(self):
+        with self._lock:
+            counts = {kind: dict(values) for kind, values in self._counts.items()}
+            in_flight = len(self._flights)
+        for values in counts.values():
+            values['saved'] = values['shared'] + values['window_hits']
+        return {'kinds': counts, 'in_flight': in_flight}
+
+
+single_flight = SingleFlight()
+
+
+@receiver(task_changed)
+def forget_flights(sender, user_id, **kwargs):
+    single_flight.forget(user_id)
+
+
+@metrics.register
+def single_flight_metrics():
+    stats = single_flight.stats()
+    samples = [('taskmanager_single_flight_in_flight', {}, stats['in_flight'])]
+    for kind, counts in sorted(stats['kinds'].items()):
+        for name, value in counts.items():
+            samples.append((f'taskmanager_single_flight_{name}_total', {'kind': kind}, value))
+    return samples
@@ -0,0 +1,117 @@
+import asyncio
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .aio import aggregate
+from .board import BOARD_COLUMNS, PRIORITY_VALUES
+from .fragments import aboard_version, board_version
+from .models import OPEN_TASK_FILTER, ArchivedTask, Task, utc_now
+from .routing import read_source, routed_collection
+from .singleflight import flight_key, single_flight
+
+
+STATS_CACHE_TTL = getattr(settings, 'TASK_STATS_CACHE_TTL', 60)
+
+
+def stats_cache_key(user_id, version):
+    # Версия доски общая для всех процессов (fragments.board_version): после записи
+    # в любом из них, в том числе после переноса в архив, ключ меняется.
+    return f'tasks:stats:{user_id}:{read_source()}:{version}'
+
+
+def stats_pipeline(user_id, now):
+    # Один проход по разделу user_id: $facet считает матрицу статус × приоритет
+    # и просроченные задачи над одним и тем же набором документов.
+    return [
+        {'$match': {'user_id': user_id}},
+        {'$facet': {
+            'matrix': [
+                {'$group': {
+                    '_id': {
+                        'status': {'$ifNull': ['$status', 'todo']},
+                        'priority': {'$ifNull': ['$priority', 0]},
+                    },
+                    'count': {'$sum': 1},
+                }},
+            ],
+            'overdue': [
+                {'$match': dict(OPEN_TASK_FILTER, due_date={'$lt': now})},
+                {'$count': 'count'},
+            ],
+        }},
+    ]
+
+
+def archive_pipeline(user_id):
+    # Перенесённые в архив задачи выполнены по определению: нужен только счёт по приоритетам.
+    return [
+        {'$match': {'user_id': user_id}},
+        {'$group': {'_id': {'$ifNull': ['$priority', 0]}, 'count': {'$sum': 1}}},
+    ]
+
+
+def compute_stats(user_id, now=None):
+    now = now or utc_now()
+    result = next(routed_collection(Task).aggregate(stats_pipeline(user_id, now)))
+    archived = list(routed_collection(ArchivedTask).aggregate(archive_pipeline(user_id)))
+    return stats_from_result(result, archived)
+
+
+async def acompute_stats(user_id, now=None):
+    now = now or utc_now()
+    result, archived = await asyncio.gather(
+        aggregate(Task, stats_pipeline(user_id, now)),
+        aggregate(ArchivedTask, archive_pipeline(user_id)),
+    )
+    return stats_from_result(result[0], archived)
+
+
+def stats_from_result(result, archived=()):
+    matrix = {status: {priority: 0 for priority in PRIORITY_VALUES} for status, _ in BOARD_COLUMNS}
+    for row in result['matrix']:
+        status, priority = row['_id']['status'], str(row['_id']['priority'])
+        if status in matrix:
+            matrix[status][priority] = matrix[status].get(priority, 0) + row['count']
+    archived_total = 0
+    for row in archived:
+        priority = str(row['_id'])
+        matrix['done'][priority] = matrix['done'].get(priority, 0) + row['count']
+        archived_total += row['count']
+
+    by_status = {status: sum(counts.values()) for status, counts in matrix.items()}
+    by_priority = {
+        priority: sum(counts.get(priority, 0) for counts in matrix.values())
+        for priority in PRIORITY_VALUES
+    }
+    total = sum(by_status.values())
+
+    return {
+        'total': total,
+        'archived': archived_total,
+        'by_status': by_status,
+        'by_priority': by_priority,
+        'matrix': matrix,
+        'overdue': result['overdue'][0]['count'] if result['overdue'] else 0,
+        'completion_rate': round(by_status['done'] / total, 4) if total else 0.0,
+    }
+
+
+def board_stats(user_id):
+    # Просроченность зависит от текущего времени, поэтому даже без записей
+    # значение живёт не дольше TASK_STATS_CACHE_TTL секунд.
+    key = stats_cache_key(user_id, board_version(user_id))
+    stats = cache.get(key)
+    if stats is None:
+        stats = single_flight.do(flight_key(user_id, 'stats'), lambda: compute_stats(user_id), window=0)
+        cache.set(key, stats, STATS_CACHE_TTL)
+    return stats
+
+
+async def aboard_stats(user_id):
+    key = stats_cache_key(user_id, await aboard_version(user_id))
+    stats = await cache.aget(key)
+    if stats is None:
+        stats = await single_flight.ado(flight_key(user_id, 'stats'), lambda: acompute_stats(user_id), window=0)
+        await cache.aset(key, stats, STATS_CACHE_TTL)
+    return stats
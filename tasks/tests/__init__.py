@@ -1,4 +1,21 @@
+import logging
+
+# JSON-записи о каждом запросе не нужны в выводе тестов.
+logging.getLogger('tasks.requests').setLevel(logging.WARNING)
+
 from .test_models import *
 from .test_views import *
 from .test_security import *
-
+from .test_search import *
+from .test_bulk import *
+from .test_export import *
+from .test_import import *
+from .test_connection import *
+from .test_routing import *
+from .test_instrumentation import *
+from .test_auth import *
+from .test_live import *
+from .test_readmodel import *
+from .test_singleflight import *
+from .test_scheduler import *
+from .test_archive import *
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import Client, TestCase
+from django.urls import reverse
+from tasks.archive import archive_batch, archive_tasks
+from tasks.board import archive_queryset, board_queryset, build_board, column_page
+from tasks.fragments import board_version
+from tasks.models import ArchivedTask, Task
+from tasks.operations import delete_task
+from tasks.stats import compute_stats
+from tasks.singleflight import single_flight
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='archivist', password='pass123')
+        Task.objects(user_id=self.user.id).delete()
+        ArchivedTask.objects(user_id=self.user.id).delete()
+        self.client.login(username='archivist', password='pass123')
+
+    def tearDown(self):
+        # id пользователей повторяются после отката транзакции теста, а архив в MongoDB — нет.
+        ArchivedTask.objects(user_id=self.user.id).delete()
+
+    def create_task(self, title, status='done', age_days=0):
+        task = Task.objects.create(title=title, user_id=self.user.id, status=status, completed=status == 'done')
+        if age_days:
+            # save() ставит updated_at = now, поэтому давность задаётся напрямую.
+            Task._get_collection().update_one(
+                {'_id': task.id}, {'$set': {'updated_at': datetime.now() - timedelta(days=age_days)}}
+            )
+        return task
+
+    def test_only_old_completed_tasks_are_moved(self):
+        old = self.create_task('Старый отчёт', age_days=40)
+        self.create_task('Свежий отчёт', age_days=1)
+        self.create_task('Старый черновик', status='todo', age_days=40)
+        
+        self.assertEqual(archive_tasks(after_days=30, pause=0), 1)
+        self.assertEqual(archive_tasks(after_days=30, pause=0), 0)
+        
+        self.assertFalse(Task.objects(id=old.id).count())
+        archived = ArchivedTask.objects.get(id=old.id)
+        self.assertEqual(archived.title, 'Старый отчёт')
+        self.assertIsNotNone(archived.archived_at)
+        self.assertEqual(Task.objects(user_id=self.user.id).count(), 2)
+
+    def test_search_reads_through_to_archive(self):
+        self.create_task('Годовой отчёт', age_days=40)
+        archive_tasks(after_days=30, pause=0)
+        
+        response = self.client.get(reverse('task_list'))
+        self.assertNotContains(response, 'Годовой отчёт')
+        
+        response = self.client.get(reverse('task_list'), {'search': 'отчёт'})
+        self.assertContains(response, 'Годовой отчёт')
+        self.assertContains(response, 'В архиве')
+
+    def test_stats_and_export_include_archive(self):
+        self.create_task('Старый отчёт', age_days=40)
+        self.create_task('Черновик', status='todo')
+        archive_tasks(after_days=30, pause=0)
+        
+        stats = compute_stats(self.user.id)
+        self.assertEqual((stats['total'], stats['archived'], stats['by_status']['done']), (2, 1, 1))
+        self.assertEqual(stats['completion_rate'], 0.5)
+        
+        response = self.client.get(reverse('task_export'), {'format': 'ndjson'})
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('Старый отчёт', content)
+        self.assertIn('Черновик', content)
+        
+        response = self.client.get(reverse('task_export'), {'format': 'ndjson', 'archived': '0'})
+        self.assertNotIn('Старый отчёт', b''.join(response.streaming_content).decode('utf-8'))
+
+    def test_done_column_pages_across_both_collections(self):
+        self.create_task('Отчёт за январь', age_days=40)
+        self.create_task('Отчёт за февраль', age_days=40)
+        archive_tasks(after_days=30, pause=0)
+        self.create_task('Отчёт за март')
+        
+        board = build_board(self.user.id, 'отчёт', limit=2)
+        done = board['columns'][2]
+        self.assertEqual(done['count'], 3)
+        self.assertEqual([card['title'] for card in done['cards']], ['Отчёт за март', 'Отчёт за февраль'])
+        
+        cards, next_cursor = column_page(
+            board_queryset(self.user.id, 'отчёт'), 'done', done['next_cursor'], 2,
+            archive_queryset(self.user.id, 'отчёт'),
+        )
+        self.assertEqual([card['title'] for card in cards], ['Отчёт за январь'])
+        self.assertTrue(cards[0]['archived'])
+        self.assertIsNone(next_cursor)
+
+    def test_task_deleted_during_batch_leaves_no_archive_copy(self):
+        deleted = self.create_task('Удалённый отчёт', age_days=40)
+        moved = self.create_task('Перенесённый отчёт', age_days=40)
+        archive = ArchivedTask._get_collection()
+        bulk_write = archive.bulk_write
+        
+        def copy_then_owner_deletes(*args, **kwargs):
+            # Владелец удаляет задачу, пока её копия пишется в архив.
+            result = bulk_write(*args, **kwargs)
+            Task._get_collection().delete_one({'_id': deleted.id})
+            return result
+        
+        with mock.patch.object(archive, 'bulk_write', copy_then_owner_deletes):
+            self.assertEqual(archive_batch(datetime.now() - timedelta(days=30)), (2, 1))
+        
+        self.assertFalse(ArchivedTask.objects(id=deleted.id).count())
+        self.assertTrue(ArchivedTask.objects(id=moved.id).count())
+        self.assertFalse(Task.objects(user_id=self.user.id).count())
+
+    def test_owner_delete_removes_copy_written_by_archiver(self):
+        # Копия уже записана, задача ещё не удалена из tasks: её удаляет владелец.
+        task = self.create_task('Отчёт', age_days=40)
+        doc = Task._get_collection().find_one({'_id': task.id})
+        ArchivedTask._get_collection().insert_one(dict(doc, archived_at=datetime.now()))
+        
+        self.assertTrue(delete_task(task.id, self.user.id))
+        self.assertFalse(ArchivedTask.objects(id=task.id).count())
+
+    def test_batch_uses_batched_deletes(self):
+        for number in range(3):
+            self.create_task(f'Отчёт {number}', age_days=40)
+        tasks = Task._get_collection()
+        
+        with mock.patch.object(tasks, 'delete_one', side_effect=AssertionError('delete_one')):
+            self.assertEqual(archive_batch(datetime.now() - timedelta(days=30)), (3, 3))
+        self.assertEqual(ArchivedTask.objects(user_id=self.user.id).count(), 3)
+
+    def test_archiving_bumps_shared_board_version(self):
+        self.create_task('Старый отчёт', age_days=40)
+        before = board_version(self.user.id)
+        
+        archive_tasks(after_days=30, pause=0)
+        # Веб-процесс узнаёт о переносе из MongoDB, а не из сигнала процесса archive_tasks.
+        single_flight.clear()
+        self.assertEqual(board_version(self.user.id), before + 1)
@@ -0,0 +1,84 @@
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+from tasks.auth import UserCache, auth_state, user_cache
+from tasks.models import Task
+
+
+class UserCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = UserCache(max_users=2, ttl=60, auth_ttl=5, clock=lambda: self.now)
+
+    def test_returns_copy_until_ttl_expires(self):
+        user = User(pk=1, username='cached')
+        _, writes = self.cache.get(1)
+        self.cache.put(1, user, writes)
+        
+        cached, _ = self.cache.get(1)
+        self.assertEqual(cached.username, 'cached')
+        self.assertIsNot(cached, user)
+        
+        self.now = 61
+        self.assertIsNone(self.cache.get(1)[0])
+
+    def test_user_changed_while_loading_is_not_cached(self):
+        _, writes = self.cache.get(1)
+        self.cache.invalidate(1)
+        self.cache.put(1, User(pk=1, username='stale'), writes)
+        
+        self.assertIsNone(self.cache.get(1)[0])
+
+    def test_auth_fields_are_rechecked_after_auth_ttl(self):
+        user = User(pk=1, username='cached', password='old-hash')
+        self.cache.put(1, user, self.cache.get(1)[1])
+        self.assertFalse(self.cache.auth_check_due(1))
+        
+        self.now = 6
+        self.assertTrue(self.cache.auth_check_due(1))
+        self.assertTrue(self.cache.auth_checked(1, auth_state(user)))
+        self.assertFalse(self.cache.auth_check_due(1))
+        
+        self.now = 12
+        self.assertFalse(self.cache.auth_checked(1, ('new-hash', True)))
+        self.assertIsNone(self.cache.get(1)[0])
+
+
+class AuthenticatedRequestQueriesTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='steady', password='pass123')
+        Task.objects(user_id=self.user.id).delete()
+        self.client.login(username='steady', password='pass123')
+
+    def test_board_does_no_sql_in_steady_state(self):
+        self.client.get(reverse('task_list'))
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('task_list'))
+        
+        self.assertEqual(response.status_code, 200)
+
+    def test_password_change_ends_cached_session(self):
+        self.client.get(reverse('task_list'))
+        self.user.set_password('new-pass456')
+        self.user.save()
+        
+        response = self.client.get(reverse('task_list'))
+        
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response.url)
+
+    def test_password_changed_in_another_process_ends_session(self):
+        self.client.get(reverse('task_list'))
+        # update() не отправляет post_save: так пароль меняет другой процесс.
+        User.objects.filter(pk=self.user.pk).update(password=make_password('new-pass456'))
+        
+        with mock.patch.object(user_cache, 'auth_ttl', 0):
+            response = self.client.get(reverse('task_list'))
+        
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response.url)
@@ -0,0 +1,82 @@
+import json
+
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.urls import reverse
+from tasks.models import Task
+
+
+class TaskBulkTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user1 = User.objects.create_user(username='user1', password='pass123')
+        self.user2 = User.objects.create_user(username='user2', password='pass456')
+        
+        self.task1 = Task(title='Bulk Task 1', user_id=self.user1.id, priority=0)
+        self.task1.save()
+        self.task2 = Task(title='Bulk Task 2', user_id=self.user1.id, priority=0)
+        self.task2.save()
+        self.foreign = Task(title='Foreign Task', user_id=self.user2.id)
+        self.foreign.save()
+        
+        self.client.login(username='user1', password='pass123')
+
+    def bulk(self, operations):
+        return self.client.post(
+            reverse('task_bulk'),
+            data=json.dumps({'operations': operations}),
+            content_type='application/json'
+        )
+
+    def test_bulk_applies_mixed_operations(self):
+        response = self.bulk([
+            {'op': 'create', 'fields': {'title': 'Bulk Created', 'status': 'todo', 'priority': 1}},
+            {'op': 'update', 'id': str(self.task1.id), 'fields': {'priority': 2, 'title': 'Bulk Renamed'}},
+            {'op': 'move', 'id': str(self.task2.id), 'status': 'done'},
+        ])
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(result['ok'] for result in response.json()['results']))
+        
+        created = Task.objects.get(id=response.json()['results'][0]['id'])
+        self.assertEqual(created.user_id, self.user1.id)
+        self.assertIn('bulk', created.search_terms)
+        
+        task1 = Task.objects.get(id=self.task1.id)
+        self.assertEqual(task1.priority, 2)
+        self.assertIn('renamed', task1.search_terms)
+        
+        task2 = Task.objects.get(id=self.task2.id)
+        self.assertEqual(task2.status, 'done')
+        self.assertTrue(task2.completed)
+
+    def test_bulk_delete_skips_foreign_tasks(self):
+        response = self.bulk([
+            {'op': 'delete', 'id': str(self.task1.id)},
+            {'op': 'delete', 'id': str(self.foreign.id)},
+        ])
+        
+        ok = [result['ok'] for result in response.json()['results']]
+        self.assertEqual(ok, [True, False])
+        self.assertEqual(len(Task.objects.filter(id=self.task1.id)), 0)
+        self.assertEqual(len(Task.objects.filter(id=self.foreign.id)), 1)
+
+    def test_bulk_reports_validation_errors_per_item(self):
+        response = self.bulk([
+            {'op': 'create', 'fields': {'title': '', 'status': 'todo', 'priority': 0}},
+            {'op': 'move', 'id': str(self.task1.id), 'status': 'archived'},
+            {'op': 'update', 'id': str(self.task2.id), 'fields': {'title': '<script>x</script>'}},
+            {'op': 'rename', 'id': str(self.task2.id)},
+        ])
+        
+        results = response.json()['results']
+        self.assertFalse(any(result['ok'] for result in results))
+        self.assertIn('title', results[0]['errors'])
+        self.assertIn('status', results[1]['errors'])
+        self.assertIn('title', results[2]['errors'])
+        self.assertIn('op', results[3]['errors'])
+        self.assertEqual(Task.objects.get(id=self.task2.id).title, 'Bulk Task 2')
+
+    def test_bulk_rejects_malformed_payload(self):
+        response = self.client.post(reverse('task_bulk'), data='not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from pymongo import ReadPreference
+from tasks import metrics
+from tasks.aio import asgi_application, async_driver_enabled
+from tasks.connection import PoolMetrics, client_options
+
+
+class ClientOptionsTest(SimpleTestCase):
+    def test_options_map_to_driver_names(self):
+        options = client_options({
+            'MAX_POOL_SIZE': 50,
+            'MIN_POOL_SIZE': 5,
+            'WAIT_QUEUE_TIMEOUT_MS': None,
+            'READ_PREFERENCE': 'secondaryPreferred',
+            'COMPRESSORS': 'zstd,zlib',
+        })
+        
+        self.assertEqual(options['maxPoolSize'], 50)
+        self.assertEqual(options['minPoolSize'], 5)
+        self.assertNotIn('waitQueueTimeoutMS', options)
+        self.assertEqual(options['read_preference'], ReadPreference.SECONDARY_PREFERRED)
+        self.assertEqual(options['compressors'], 'zstd,zlib')
+
+    def test_unknown_read_preference_is_rejected(self):
+        with self.assertRaises(ValueError):
+            client_options({'READ_PREFERENCE': 'fastest'})
+
+
+class PoolMetricsTest(SimpleTestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.listener = PoolMetrics(clock=lambda: self.now)
+        self.address = ('db', 27017)
+
+    def event(self, **kwargs):
+        return SimpleNamespace(address=self.address, connection_id=1, **kwargs)
+
+    def test_checkouts_and_wait_time(self):
+        self.listener.pool_created(self.event())
+        self.listener.connection_created(self.event())
+        self.listener.connection_check_out_started(self.event())
+        self.now = 0.25
+        self.listener.connection_checked_out(self.event())
+        self.listener.connection_check_out_started(self.event())
+        self.listener.connection_checked_out(self.event(duration=0.5))
+        self.listener.connection_checked_in(self.event())
+        
+        pool = self.listener.pools[('main', 'db:27017')]
+        self.assertEqual(pool['connections'], 1)
+        self.assertEqual(pool['checked_out'], 1)
+        self.assertEqual(pool['checkouts'], 2)
+        self.assertAlmostEqual(pool['wait_seconds_sum'], 0.75)
+        self.assertEqual(pool['wait_seconds_max'], 0.5)
+
+    def test_pool_gauges_are_exported(self):
+        self.listener.connection_check_out_failed(self.event(reason='timeout'))
+        samples = {(name, labels.get('address')): value for name, labels, value in self.listener.samples()}
+        
+        self.assertEqual(samples[('taskmanager_mongodb_pool_checkout_failures_total', 'db:27017')], 1)
+        self.assertIn('taskmanager_mongodb_pool_max_size', metrics.render_prometheus())
+
+    def test_closing_one_client_keeps_other_pools(self):
+        other = self.listener.for_client('async-1')
+        self.listener.connection_created(self.event())
+        other.connection_created(self.event())
+        other.connection_created(self.event())
+        
+        other.pool_closed(self.event())
+        
+        self.assertEqual(list(self.listener.pools), [('main', 'db:27017')])
+        self.assertEqual(self.listener.pools[('main', 'db:27017')]['connections'], 1)
+        samples = {(name, labels.get('client')) for name, labels, value in self.listener.samples()}
+        self.assertIn(('taskmanager_mongodb_pool_connections', 'main'), samples)
+
+
+@override_settings(MONGODB=dict(settings.MONGODB, ASYNC=True))
+class AsyncDriverTest(SimpleTestCase):
+    def test_wsgi_requests_use_sync_driver(self):
+        # Новый цикл на каждый запрос: клиент на цикл плодил бы пулы соединений.
+        async def view():
+            return async_driver_enabled()
+        
+        self.assertFalse(async_to_sync(view)())
+
+    def test_asgi_wrapper_enables_driver_and_handles_lifespan(self):
+        seen, sent = [], []
+        
+        async def django_app(scope, receive, send):
+            seen.append(async_driver_enabled())
+        
+        async def serve():
+            app = asgi_application(django_app)
+            await app({'type': 'http'}, None, None)
+            messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+            
+            async def receive():
+                return next(messages)
+            
+            async def send(message):
+                sent.append(message['type'])
+            
+            await app({'type': 'lifespan'}, receive, send)
+        
+        asyncio.run(serve())
+        
+        self.assertEqual(seen, [True])
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
@@ -0,0 +1,77 @@
+import csv
+import gzip
+import io
+import json
+
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.urls import reverse
+from tasks.export import EXPORT_FIELDS
+from tasks.importer import import_tasks, iter_rows
+from tasks.models import Task
+
+
+class TaskExportTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user1 = User.objects.create_user(username='exporter', password='pass123')
+        self.user2 = User.objects.create_user(username='stranger', password='pass456')
+        Task.objects(user_id__in=[self.user1.id, self.user2.id]).delete()
+        
+        Task(title='Отчёт, "квартал"', description='Строка 1\nСтрока 2', user_id=self.user1.id, priority=2).save()
+        Task(title='Купить молоко', user_id=self.user1.id, status='done').save()
+        Task(title='Foreign Task', user_id=self.user2.id).save()
+        
+        self.client.login(username='exporter', password='pass123')
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv_export_streams_only_own_tasks(self):
+        response = self.client.get(reverse('task_export'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(self.content(response).decode('utf-8'))))
+        self.assertEqual(list(rows[0]), list(EXPORT_FIELDS))
+        self.assertEqual([row['title'] for row in rows], ['Купить молоко', 'Отчёт, "квартал"'])
+        self.assertEqual(rows[1]['description'], 'Строка 1\nСтрока 2')
+
+    def test_ndjson_export_with_gzip_and_filters(self):
+        response = self.client.get(reverse('task_export'), {'format': 'ndjson', 'gzip': '1', 'priority': '2'})
+        
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lines = gzip.decompress(self.content(response)).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['title'], 'Отчёт, "квартал"')
+        self.assertEqual(json.loads(lines[0])['status'], 'todo')
+
+    def test_export_import_round_trip_keeps_due_date(self):
+        Task.objects(user_id=self.user1.id).delete()
+        source = io.BytesIO('title,due_date\nСрок,2026-01-15T12:00\n'.encode('utf-8'))
+        import_tasks(self.user1.id, iter_rows(source, 'csv'))
+        original = Task.objects.get(user_id=self.user1.id).due_date
+        
+        exported = self.content(self.client.get(reverse('task_export')))
+        row = next(csv.DictReader(io.StringIO(exported.decode('utf-8'))))
+        self.assertTrue(row['due_date'].endswith('+00:00'))
+        self.assertTrue(row['created_at'].endswith('+00:00'))
+        
+        report = import_tasks(self.user2.id, iter_rows(io.BytesIO(exported), 'csv'))
+        self.assertEqual(report.inserted, 1)
+        self.assertEqual(Task.objects.get(user_id=self.user2.id, title='Срок').due_date, original)
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('task_export'), {'format': 'xml'})
+        
+        self.assertEqual(response.status_code, 400)
+
+    async def test_asgi_export_streams_asynchronously(self):
+        await self.async_client.alogin(username='exporter', password='pass123')
+        
+        response = await self.async_client.get(reverse('task_export'), {'format': 'ndjson'})
+        
+        # Асинхронный итератор: Django не собирает выгрузку в список перед отправкой.
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['Купить молоко', 'Отчёт, "квартал"'])
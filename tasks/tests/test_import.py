@@ -0,0 +1,74 @@
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.urls import reverse
+from tasks.importer import import_tasks, iter_rows
+from tasks.models import Task
+
+
+class TaskImportTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='importer', password='pass123')
+        Task.objects(user_id=self.user.id).delete()
+
+    def test_csv_import_inserts_valid_rows_and_reports_errors(self):
+        data = (
+            '\ufefftitle,description,status,priority,due_date,id\n'
+            'Первая,"Строка 1\nСтрока 2",done,2,2026-01-15T10:30,abc\n'
+            ',Без названия,todo,0,,\n'
+            'Вторая,,blocked,1,,\n'
+            'Третья,,,,,\n'
+        ).encode('utf-8')
+        
+        report = import_tasks(self.user.id, iter_rows(io.BytesIO(data), 'csv'), batch_size=2)
+        
+        self.assertEqual((report.rows, report.inserted, report.failed), (4, 2, 2))
+        self.assertEqual([item['line'] for item in report.errors], [4, 5])
+        self.assertIn('title', report.errors[0]['errors'])
+        self.assertIn('status', report.errors[1]['errors'])
+        
+        first = Task.objects.get(user_id=self.user.id, title='Первая')
+        self.assertEqual(first.description, 'Строка 1\nСтрока 2')
+        self.assertTrue(first.completed)
+        self.assertEqual(first.due_date.day, 15)
+        self.assertIn('перв', first.search_terms)
+        third = Task.objects.get(user_id=self.user.id, title='Третья')
+        self.assertEqual((third.status, third.priority), ('todo', 0))
+
+    def test_upload_ndjson_file(self):
+        self.client.login(username='importer', password='pass123')
+        upload = SimpleUploadedFile(
+            'tasks.ndjson',
+            b'{"title": "JSON Task", "priority": 1}\nnot json\n{"title": "<script>x</script>"}\n'
+        )
+        
+        response = self.client.post(reverse('task_import'), {'file': upload})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report'].inserted, 1)
+        self.assertEqual([item['line'] for item in response.context['report'].errors], [2, 3])
+        self.assertEqual(Task.objects(user_id=self.user.id).count(), 1)
+
+    def test_unreadable_file_is_reported_as_error(self):
+        self.client.login(username='importer', password='pass123')
+        upload = SimpleUploadedFile('tasks.csv', 'title\nFirst\nВторая\nThird\n'.encode('cp1251'))
+        
+        response = self.client.post(reverse('task_import'), {'file': upload})
+        
+        self.assertEqual(response.status_code, 200)
+        report = response.context['report']
+        self.assertEqual((report.inserted, report.failed), (1, 1))
+        self.assertEqual(report.errors[0]['line'], 3)
+        self.assertIn('UTF-8', report.errors[0]['errors']['__all__'][0])
+        self.assertEqual(Task.objects(user_id=self.user.id).count(), 1)
+
+    def test_broken_csv_is_reported_as_error(self):
+        data = 'title,description\nПервая,"{}"\n'.format('x' * 200000).encode('utf-8')
+        
+        report = import_tasks(self.user.id, iter_rows(io.BytesIO(data), 'csv'))
+        
+        self.assertEqual((report.inserted, report.failed), (0, 1))
+        self.assertIn('Некорректный CSV', report.errors[0]['errors']['__all__'][0])
@@ -0,0 +1,76 @@
+import json
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from tasks.instrumentation import RequestMetrics, RequestTimings, command_timer, current_timings
+from tasks.models import Task
+
+
+class RequestTimingsTest(SimpleTestCase):
+    def test_command_listener_counts_only_inside_request(self):
+        event = SimpleNamespace(duration_micros=1500)
+        command_timer.succeeded(event)
+        
+        timings = RequestTimings()
+        with timings.active():
+            self.assertIs(current_timings(), timings)
+            command_timer.succeeded(event)
+            command_timer.failed(event)
+        
+        self.assertIsNone(current_timings())
+        self.assertEqual(timings.mongo_commands, 2)
+        self.assertAlmostEqual(timings.mongo_seconds, 0.003)
+        self.assertIn('mongo;dur=3.0;desc="2 commands"', timings.server_timing())
+
+    def test_duration_histogram_is_cumulative(self):
+        request_metrics = RequestMetrics()
+        for seconds in (0.003, 0.2, 7.0):
+            timings = RequestTimings()
+            timings.total_seconds = seconds
+            request_metrics.observe('task_list', timings)
+        
+        buckets = {
+            labels['le']: value
+            for name, labels, value in request_metrics.samples()
+            if name == 'taskmanager_request_duration_seconds_bucket'
+        }
+        
+        self.assertEqual(buckets[0.005], 1)
+        self.assertEqual(buckets[0.25], 2)
+        self.assertEqual(buckets[5.0], 2)
+        self.assertEqual(buckets['+Inf'], 3)
+
+
+class RequestTimingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='timing', password='pass123', is_staff=True)
+        Task.objects(user_id=self.user.id).delete()
+        self.client.login(username='timing', password='pass123')
+
+    def test_server_timing_header_and_log_record(self):
+        with self.assertLogs('tasks.requests', 'INFO') as logs:
+            response = self.client.get(reverse('task_list'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'sql;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(response['Server-Timing'], r'tpl;dur=[\d.]+')
+        
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'task_list')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['sql_queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        
+        metrics = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('taskmanager_request_duration_seconds_count{view="task_list"}', metrics)
+
+    @override_settings(TASK_REQUEST_TIMING=dict(settings.TASK_REQUEST_TIMING, SAMPLE_RATE=0))
+    def test_unsampled_request_is_not_instrumented(self):
+        response = self.client.get(reverse('task_list'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
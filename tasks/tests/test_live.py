@@ -0,0 +1,190 @@
+import json
+from datetime import datetime, timedelta
+from unittest import mock
+
+from bson import ObjectId
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+from pymongo.errors import OperationFailure
+from tasks import live, views
+from tasks.live import BoardEvents
+from tasks.models import Task
+
+
+def document(**fields):
+    return dict({
+        '_id': ObjectId(),
+        'user_id': 1,
+        'title': 'Подготовить отчёт',
+        'status': 'todo',
+        'priority': 2,
+        'search_terms': ['подготовить', 'отчёт'],
+    }, **fields)
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+class BoardEventsTest(SimpleTestCase):
+    def setUp(self):
+        self.hub = BoardEvents(autostart=False)
+
+    def test_document_is_sent_to_owner_subscriptions_only(self):
+        board = self.hub.subscribe(1)
+        filtered = self.hub.subscribe(1, 'отчёт', '', '0')
+        other = self.hub.subscribe(2)
+        doc = document()
+        
+        self.hub.handle_change({'operationType': 'insert', 'fullDocument': doc})
+        
+        [upsert] = drain(board)
+        self.assertEqual(upsert['type'], 'upsert')
+        self.assertTrue(upsert['created'])
+        self.assertIn(f'data-task-id="{doc["_id"]}"', upsert['html'])
+        self.assertEqual(drain(filtered), [{'type': 'delete', 'id': str(doc['_id'])}])
+        self.assertEqual(drain(other), [])
+
+    def test_overflow_is_replaced_with_resync(self):
+        board = self.hub.subscribe(1)
+        for _ in range(board.queue.maxsize + 1):
+            self.hub.dispatch_document(document())
+        
+        self.assertEqual(drain(board), [{'type': 'resync'}])
+
+    def test_delete_reaches_owner_only(self):
+        board = self.hub.subscribe(1)
+        other = self.hub.subscribe(2)
+        doc = document()
+        self.hub.dispatch_document(doc)
+        drain(board)
+        
+        self.hub.handle_change({'operationType': 'delete', 'documentKey': {'_id': doc['_id']}})
+        self.hub.handle_change({'operationType': 'delete', 'documentKey': {'_id': ObjectId()}})
+        pre_image = document(user_id=2)
+        self.hub.handle_change({
+            'operationType': 'delete',
+            'documentKey': {'_id': pre_image['_id']},
+            'fullDocumentBeforeChange': pre_image,
+        })
+        
+        self.assertEqual(drain(board), [{'type': 'delete', 'id': str(doc['_id'])}])
+        self.assertEqual(drain(other), [{'type': 'delete', 'id': str(pre_image['_id'])}])
+
+    def test_lost_history_restarts_stream_with_resync(self):
+        board = self.hub.subscribe(1)
+        self.hub.resume_token = {'_data': 'expired'}
+        self.hub.poll_interval = 0
+        tokens = []
+        
+        def watch_changes():
+            tokens.append(self.hub.resume_token)
+            if len(tokens) == 1:
+                raise OperationFailure('history lost', code=286)
+            self.hub._stop.set()
+        
+        # Не зависит от TASK_LIVE_CHANGE_STREAMS в окружении.
+        with mock.patch.object(live, 'CHANGE_STREAMS', True):
+            with mock.patch.object(self.hub, 'watch_changes', watch_changes), self.assertLogs('tasks.live', 'WARNING'):
+                self.hub.run()
+        
+        self.assertEqual(tokens, [{'_data': 'expired'}, None])
+        self.assertEqual(drain(board), [{'type': 'resync'}])
+
+    def test_polling_stops_with_zero_interval(self):
+        self.hub.poll_interval = 0
+        polls = []
+        
+        def poll_once():
+            polls.append(1)
+            self.hub._stop.set()
+        
+        with mock.patch.object(live, 'CHANGE_STREAMS', False), mock.patch.object(self.hub, 'poll_once', poll_once):
+            self.hub.run()
+        
+        self.assertEqual(polls, [1])
+
+    def test_unsubscribed_stream_gets_nothing(self):
+        board = self.hub.subscribe(1)
+        self.hub.unsubscribe(board)
+        self.hub.dispatch_document(document())
+        
+        self.assertEqual(drain(board), [])
+        self.assertEqual(self.hub.stats()['subscribers'], 0)
+
+
+class BoardPollingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='live', password='pass123')
+        Task.objects(user_id=self.user.id).delete()
+        self.hub = BoardEvents(autostart=False)
+        self.hub._since = datetime.now() - timedelta(seconds=1)
+        self.board = self.hub.subscribe(self.user.id)
+
+    def test_polling_sends_updates_and_resync_after_delete(self):
+        self.hub.poll_once()
+        task = Task(title='Новая задача', user_id=self.user.id)
+        task.save()
+        
+        self.hub.poll_once()
+        [upsert] = drain(self.board)
+        self.assertEqual(upsert['id'], str(task.id))
+        
+        task.delete()
+        self.hub.poll_once()
+        self.assertEqual(drain(self.board), [{'type': 'resync'}])
+
+
+    def test_idle_poll_does_not_read_tasks(self):
+        Task(title='Старая задача', user_id=self.user.id).save()
+        self.hub.poll_once()
+        drain(self.board)
+        
+        with mock.patch.object(Task, '_get_collection', side_effect=AssertionError('tasks read')):
+            self.hub.poll_once()
+        self.assertEqual(drain(self.board), [])
+
+
+class TaskEventsViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='stream', password='pass123')
+        self.client.login(username='stream', password='pass123')
+        self.hub = BoardEvents(autostart=False)
+
+    def test_wsgi_board_does_not_open_stream(self):
+        # Под WSGI подключение держало бы рабочий поток, пока открыта вкладка.
+        self.assertNotContains(self.client.get(reverse('task_list')), 'EventSource')
+        
+        with mock.patch.object(views, 'board_events', self.hub):
+            response = self.client.get(reverse('task_events'))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.hub.stats()['subscribers'], 0)
+
+    async def test_asgi_board_opens_stream(self):
+        await self.async_client.alogin(username='stream', password='pass123')
+        
+        response = await self.async_client.get(reverse('task_list'))
+        self.assertContains(response, 'EventSource')
+
+    def test_stream_delivers_board_events(self):
+        with mock.patch.object(views, 'board_events', self.hub), mock.patch.object(views, 'WSGI_STREAMS', True):
+            response = self.client.get(reverse('task_events'))
+        
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        self.assertTrue(next(chunks).startswith(b'retry:'))
+        
+        doc = document(user_id=self.user.id)
+        self.hub.dispatch_document(doc)
+        event = next(chunks).decode()
+        
+        self.assertIn('event: upsert', event)
+        self.assertEqual(json.loads(event.split('data: ', 1)[1])['id'], str(doc['_id']))
+        
+        response.close()
+        self.assertEqual(self.hub.stats()['subscribers'], 0)
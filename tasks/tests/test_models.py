@@ -1,6 +1,6 @@
 from django.test import TestCase
 from django.contrib.auth.models import User
-from tasks.models import Task
+from tasks.models import Task, user_identity_scope
 from datetime import datetime
 
 
@@ -86,3 +86,29 @@ class TaskModelTest(TestCase):
         self.assertFalse(task.completed)
         self.assertIsNone(task.due_date)
 
+
+    def test_attach_users_loads_users_in_one_query(self):
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        tasks = [
+            Task(title=f'Task {i}', user_id=user.id)
+            for i, user in enumerate([self.user, other, self.user, other])
+        ]
+        
+        with self.assertNumQueries(1):
+            Task.attach_users(tasks)
+            self.assertEqual([task.user for task in tasks], [self.user, other, self.user, other])
+
+    def test_user_property_uses_identity_map(self):
+        tasks = [Task(title='First', user_id=self.user.id), Task(title='Second', user_id=self.user.id)]
+        
+        with user_identity_scope(), self.assertNumQueries(1):
+            self.assertEqual(tasks[0].user, self.user)
+            self.assertEqual(tasks[1].user, self.user)
+            self.assertEqual(tasks[0].user, self.user)
+
+    def test_user_property_for_missing_user(self):
+        task = Task(title='Orphan', user_id=self.user.id + 1000)
+        
+        with self.assertNumQueries(1):
+            self.assertIsNone(task.user)
+            self.assertIsNone(task.user)
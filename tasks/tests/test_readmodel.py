@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+from bson import ObjectId
+from tasks.models import Task
+from tasks.operations import get_owned_task
+from tasks.readmodel import TaskRow
+
+
+class TaskRowTest(SimpleTestCase):
+    def test_missing_fields_take_model_defaults(self):
+        row = TaskRow({'_id': ObjectId(), 'title': 'Отчёт'})
+        
+        self.assertEqual(row.status, 'todo')
+        self.assertEqual(row.priority, 0)
+        self.assertFalse(row.completed)
+        self.assertEqual(str(row), 'Отчёт')
+
+    def test_fields_outside_projection_are_not_set(self):
+        row = TaskRow({'_id': ObjectId(), 'title': 'Отчёт', 'description': 'x' * 1000}, ('id', 'title'))
+        
+        self.assertEqual(row.title, 'Отчёт')
+        with self.assertRaises(AttributeError):
+            row.description
+        self.assertFalse(hasattr(row, '__dict__'))
+
+
+class OwnedTaskRowTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='rows', password='pass123')
+        self.client.login(username='rows', password='pass123')
+        self.task = Task(title='Проверить договор', description='Описание', priority=2, user_id=self.user.id)
+        self.task.save()
+
+    def test_owner_lookup_returns_projected_row(self):
+        row = get_owned_task(str(self.task.id), self.user.id, fields=('title',))
+        
+        self.assertIsInstance(row, TaskRow)
+        self.assertEqual(row.pk, self.task.id)
+        self.assertEqual(row.title, 'Проверить договор')
+        self.assertIsNone(get_owned_task(str(self.task.id), self.user.id + 1))
+
+    def test_edit_form_is_filled_from_row(self):
+        response = self.client.get(reverse('task_edit', args=[self.task.id]))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['form'].initial['priority'], 2)
+        self.assertEqual(response.context['form'].initial['description'], 'Описание')
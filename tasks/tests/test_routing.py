@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from pymongo.read_preferences import SecondaryPreferred
+from tasks import fragments, views
+from tasks.fragments import board_fragment_key, query_board_version
+from tasks.models import BoardVersion, Task
+from tasks.stats import stats_cache_key
+from tasks.routing import (
+    RECENT_WRITE_SESSION_KEY, current_read_preference, replica_read_preference, replica_reads, routed,
+)
+
+
+class ReplicaReadPreferenceTest(SimpleTestCase):
+    def test_secondary_preferred_with_max_staleness(self):
+        preference = replica_read_preference()
+        
+        self.assertIsInstance(preference, SecondaryPreferred)
+        self.assertEqual(preference.max_staleness, 90)
+
+    @override_settings(MONGODB=dict(settings.MONGODB, REPLICA_READ_PREFERENCE='primary'))
+    def test_primary_disables_routing(self):
+        with replica_reads():
+            self.assertIsNone(current_read_preference())
+
+    def test_queryset_is_routed_only_inside_replica_reads(self):
+        self.assertIsNone(routed(Task.objects(user_id=1))._read_preference)
+        
+        with replica_reads():
+            self.assertEqual(routed(Task.objects(user_id=1))._read_preference, replica_read_preference())
+
+    def test_replica_results_are_cached_apart_from_primary(self):
+        # Автор записи читает с primary и не получает фрагмент, собранный с отстающей реплики.
+        primary = (board_fragment_key(1, 'digest'), stats_cache_key(1, 5))
+        with replica_reads():
+            replica = (board_fragment_key(1, 'digest'), stats_cache_key(1, 5))
+        
+        self.assertNotEqual(primary[0], replica[0])
+        self.assertNotEqual(primary[1], replica[1])
+
+    def test_board_version_is_read_from_the_same_node_as_tasks(self):
+        seen = []
+        
+        def routed_collection(document):
+            seen.append((document, current_read_preference()))
+            return document._get_collection()
+        
+        with mock.patch.object(fragments, 'routed_collection', routed_collection), replica_reads():
+            query_board_version(1)
+        
+        self.assertEqual(seen, [(BoardVersion, replica_read_preference())])
+
+
+class RecentWriteRoutingTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='replica', password='pass123')
+        Task.objects(user_id=self.user.id).delete()
+        self.client.login(username='replica', password='pass123')
+
+    def list_read_preference(self):
+        seen = []
+        original = views.board_stats
+        
+        def board_stats(user_id):
+            seen.append(current_read_preference())
+            return original(user_id)
+        
+        with mock.patch.object(views, 'board_stats', board_stats):
+            response = self.client.get(reverse('task_list'))
+        
+        self.assertEqual(response.status_code, 200)
+        return seen[0]
+
+    def test_board_reads_from_replica_without_recent_writes(self):
+        self.assertIsInstance(self.list_read_preference(), SecondaryPreferred)
+        self.assertNotIn(RECENT_WRITE_SESSION_KEY, self.client.session)
+
+    def test_redirect_after_create_reads_from_primary(self):
+        response = self.client.post(reverse('task_create'), {
+            'title': 'Новая задача',
+            'status': 'todo',
+            'priority': 1,
+        })
+        
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        self.assertIn(RECENT_WRITE_SESSION_KEY, self.client.session)
+        self.assertIsNone(self.list_read_preference())
+
+    def test_marker_expires(self):
+        session = self.client.session
+        session[RECENT_WRITE_SESSION_KEY] = 0
+        session.save()
+        
+        self.assertIsInstance(self.list_read_preference(), SecondaryPreferred)
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from tasks.forms import TaskForm
+from tasks.models import Task, TaskNotification
+from tasks.operations import new_task_document, toggle_task
+from tasks.scheduler import ReminderScheduler
+
+
+class ReminderSchedulerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='deadlines', password='pass123')
+        Task.objects(user_id=self.user.id).delete()
+        TaskNotification.objects.delete()
+        self.now = datetime.now()
+        self.scheduler = self.make_scheduler()
+
+    def make_scheduler(self, **options):
+        options.setdefault('lead_time', 3600)
+        options.setdefault('horizon', 6 * 3600)
+        return ReminderScheduler(clock=lambda: self.now, **options)
+
+    def create_task(self, title, due_in=None, **fields):
+        due_date = self.now + due_in if due_in is not None else None
+        return Task.objects.create(title=title, user_id=self.user.id, due_date=due_date, **fields)
+
+    def notifications(self):
+        return sorted((item.title, item.kind) for item in TaskNotification.objects(user_id=self.user.id))
+
+    def test_due_and_overdue_tasks_are_written_once(self):
+        self.create_task('Просрочена', timedelta(minutes=-10))
+        self.create_task('Скоро срок', timedelta(minutes=30))
+        self.create_task('Позже', timedelta(hours=3))
+        self.create_task('Выполнена', timedelta(minutes=-10), completed=True, status='done')
+        self.create_task('Без срока')
+        
+        self.assertEqual(self.scheduler.tick(), 2)
+        self.assertEqual(self.notifications(), [('Просрочена', 'overdue'), ('Скоро срок', 'due_soon')])
+        self.assertEqual(self.scheduler.tick(), 0)
+        
+        restarted = self.make_scheduler()
+        self.assertEqual(restarted.tick(), 0)
+        self.assertEqual(restarted.stats()['duplicates'], 2)
+
+    def test_changed_due_date_is_picked_up_from_updated_at(self):
+        self.scheduler.tick()
+        task = self.create_task('Новая', timedelta(minutes=90))
+        
+        self.now += timedelta(minutes=31)
+        self.assertEqual(self.scheduler.tick(), 1)
+        
+        task.due_date = self.now + timedelta(hours=5)
+        task.save()
+        self.now += timedelta(minutes=60)
+        self.assertEqual(self.scheduler.tick(), 0)
+        self.assertEqual(self.notifications(), [('Новая', 'due_soon')])
+        self.assertEqual(self.scheduler.stats()['stale'], 1)
+
+    def test_completed_task_is_not_reminded(self):
+        task = self.create_task('Сделаю вовремя', timedelta(minutes=90))
+        self.scheduler.tick()
+        
+        task.completed = True
+        task.save()
+        self.now += timedelta(hours=2)
+        
+        self.assertEqual(self.scheduler.tick(), 0)
+        self.assertEqual(self.notifications(), [])
+
+    def test_toggled_task_is_not_reminded(self):
+        task = self.create_task('Отмечена', timedelta(minutes=-10))
+        toggle_task(task.id, self.user.id)
+        
+        self.assertEqual(Task.objects.get(id=task.id).status, 'todo')
+        self.assertEqual(self.scheduler.tick(), 0)
+        self.assertEqual(self.notifications(), [])
+
+    def test_deadline_from_form_fires_at_local_time(self):
+        # 12:00 по Москве хранится как 09:00 UTC; часы планировщика тоже в UTC.
+        form = TaskForm({'title': 'Сдать отчёт', 'status': 'todo', 'priority': '1', 'due_date': '2026-01-10T12:00'})
+        self.assertTrue(form.is_valid())
+        Task._get_collection().insert_one(new_task_document(self.user.id, form.cleaned_data))
+        
+        self.now = datetime(2026, 1, 10, 7, 30)
+        self.assertEqual(self.scheduler.tick(), 0)
+        self.now = datetime(2026, 1, 10, 8, 30)
+        self.assertEqual(self.scheduler.tick(), 1)
+        self.now = datetime(2026, 1, 10, 8, 59)
+        self.assertEqual(self.scheduler.tick(), 0)
+        self.now = datetime(2026, 1, 10, 9, 1)
+        self.assertEqual(self.scheduler.tick(), 1)
+        self.assertEqual(self.notifications(), [('Сдать отчёт', 'due_soon'), ('Сдать отчёт', 'overdue')])
+
+    def test_horizon_moves_in_slices(self):
+        scheduler = self.make_scheduler(horizon=3600, lead_time=600)
+        self.create_task('Далеко', timedelta(hours=2))
+        scheduler.tick()
+        self.assertEqual(scheduler.stats()['scheduled'], 0)
+        
+        self.now += timedelta(minutes=40)
+        scheduler.tick()
+        self.assertEqual(scheduler.stats()['scheduled'], 0)
+        
+        self.now += timedelta(minutes=30)
+        scheduler.tick()
+        self.assertEqual(scheduler.stats()['scheduled'], 2)
@@ -0,0 +1,184 @@
+import io
+from datetime import datetime
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.urls import reverse
+from tasks.autocomplete import AutocompleteCache
+from tasks.fragments import board_version
+from tasks.models import ArchivedTask, Task
+from tasks.singleflight import single_flight
+from tasks.search import rank_suggestions
+from tasks.signals import task_changed
+from tasks.text import index_terms, query_terms
+
+
+class SearchTermsTest(TestCase):
+    def test_cyrillic_case_folding(self):
+        self.assertEqual(query_terms('ОТЧЁТ Квартал'), ['отчет', 'квартал'])
+        self.assertIn('отч', index_terms('Отчёт за квартал'))
+
+    def test_description_indexes_whole_words_only(self):
+        terms = index_terms('Задача', 'Подготовить презентацию')
+        self.assertIn('презентацию', terms)
+        self.assertNotIn('през', terms)
+        self.assertIn('за', terms)
+
+    def test_one_character_terms_are_indexed(self):
+        terms = index_terms('Отчёт в 5 этаж', 'я')
+        self.assertTrue({'о', 'в', '5', 'э', 'я'} <= set(terms))
+
+    def test_rank_prefers_title_prefix(self):
+        titles = ['Позвонить про отчёт', 'Отчёт за квартал', 'отчёт']
+        self.assertEqual(
+            rank_suggestions(titles, 'Отчёт'),
+            ['отчёт', 'Отчёт за квартал', 'Позвонить про отчёт']
+        )
+
+
+class SearchViewsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='searcher', password='pass123')
+        Task.objects(user_id=self.user.id).delete()
+        Task(title='Отчёт за квартал', user_id=self.user.id).save()
+        Task(title='Купить молоко', description='Зайти в магазин', user_id=self.user.id).save()
+
+    def test_task_list_search_uses_prefix_terms(self):
+        self.client.login(username='searcher', password='pass123')
+        response = self.client.get(reverse('task_list'), {'search': 'ОТЧЕ'})
+
+        self.assertContains(response, 'Отчёт за квартал')
+        self.assertNotContains(response, 'Купить молоко')
+
+    def test_task_list_search_by_one_character(self):
+        self.client.login(username='searcher', password='pass123')
+        response = self.client.get(reverse('task_list'), {'search': 'М'})
+
+        self.assertContains(response, 'Купить молоко')
+        self.assertNotContains(response, 'Отчёт за квартал')
+
+    def test_rebuild_reindexes_archive_and_resets_board_cache(self):
+        # Задача перенесена в архив с термами, построенными без однобуквенных префиксов.
+        task = Task.objects.get(user_id=self.user.id, title='Купить молоко')
+        doc = Task._get_collection().find_one({'_id': task.id})
+        Task._get_collection().delete_one({'_id': task.id})
+        ArchivedTask._get_collection().insert_one(
+            dict(doc, search_terms=[term for term in doc['search_terms'] if len(term) > 1], archived_at=datetime.now())
+        )
+        self.addCleanup(ArchivedTask.objects(user_id=self.user.id).delete)
+        version = board_version(self.user.id)
+        
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        
+        self.assertIn('м', ArchivedTask._get_collection().find_one({'_id': task.id})['search_terms'])
+        single_flight.clear()
+        self.assertEqual(board_version(self.user.id), version + 1)
+
+    def test_task_list_search_matches_description_words(self):
+        self.client.login(username='searcher', password='pass123')
+        response = self.client.get(reverse('task_list'), {'search': 'магазин'})
+
+        self.assertContains(response, 'Купить молоко')
+
+    def test_autocomplete_returns_ranked_titles(self):
+        self.client.login(username='searcher', password='pass123')
+        response = self.client.get(reverse('task_autocomplete'), {'q': 'отч'})
+
+        self.assertEqual(response.json()['suggestions'], ['Отчёт за квартал'])
+
+    async def test_async_endpoints_under_asgi(self):
+        await self.async_client.alogin(username='searcher', password='pass123')
+        
+        response = await self.async_client.get(reverse('task_autocomplete'), {'q': 'отч'})
+        self.assertEqual(response.json()['suggestions'], ['Отчёт за квартал'])
+        
+        response = await self.async_client.get(reverse('task_column'), {'status': 'todo', 'search': 'молоко'})
+        self.assertIn('Купить молоко', response.json()['html'])
+        
+        response = await self.async_client.get(reverse('task_stats'))
+        self.assertEqual(response.json()['total'], 2)
+
+
+class AutocompleteCacheTest(TestCase):
+    def setUp(self):
+        self.now = 0
+        self.cache = AutocompleteCache(max_users=1, ttl=60, clock=lambda: self.now)
+        self.user = User.objects.create_user(username='typist', password='pass123')
+        Task.objects(user_id=self.user.id).delete()
+        self.task = Task(title='Отчёт за квартал', user_id=self.user.id)
+        self.task.save()
+
+    def test_second_lookup_is_served_from_memory(self):
+        self.assertEqual(self.cache.suggest(self.user.id, 'отч'), ['Отчёт за квартал'])
+        self.assertEqual(self.cache.suggest(self.user.id, 'квар'), ['Отчёт за квартал'])
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_task_write_invalidates_entry(self):
+        self.cache.suggest(self.user.id, 'отч')
+        invalidate = lambda sender, user_id, **kwargs: self.cache.invalidate(user_id)
+        task_changed.connect(invalidate)
+        try:
+            Task(title='Отчёт по продажам', user_id=self.user.id).save()
+        finally:
+            task_changed.disconnect(invalidate)
+
+        self.assertEqual(
+            self.cache.suggest(self.user.id, 'отчет'),
+            ['Отчёт по продажам', 'Отчёт за квартал']
+        )
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+    def test_entries_expire_and_are_evicted(self):
+        self.cache.suggest(self.user.id, 'отч')
+        self.now = 61
+        self.cache.suggest(self.user.id, 'отч')
+        self.cache.put(self.user.id + 1, self.cache.get(self.user.id), self.cache.generation(self.user.id + 1))
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['evictions'], 2)
+        self.assertEqual(stats['users'], 1)
+
+    def test_other_users_writes_do_not_discard_loaded_index(self):
+        load = self.cache.load
+        
+        def load_during_writes(user_id):
+            # Пока индекс строится, задачи меняет другой пользователь.
+            self.cache.invalidate(user_id + 1)
+            return load(user_id)
+        
+        with mock.patch.object(self.cache, 'load', load_during_writes):
+            for query in ('отч', 'квар', 'отчет'):
+                self.cache.suggest(self.user.id, query)
+        
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['users']), (2, 1, 1))
+
+    def test_own_write_during_load_discards_index(self):
+        load = self.cache.load
+        
+        def load_during_own_write(user_id):
+            self.cache.invalidate(user_id)
+            return load(user_id)
+        
+        with mock.patch.object(self.cache, 'load', load_during_own_write):
+            self.cache.suggest(self.user.id, 'отч')
+        
+        self.assertEqual(self.cache.stats()['users'], 0)
+
+    def test_total_terms_budget_evicts_oldest_indexes(self):
+        cache = AutocompleteCache(max_users=10, max_total_terms=20, clock=lambda: self.now)
+        entry = cache.load(self.user.id)
+        self.assertEqual(entry.size, 14)
+        
+        cache.put(1, entry, cache.generation(1))
+        cache.put(2, entry, cache.generation(2))
+        
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.stats()['terms'], 14)
@@ -1,6 +1,7 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory
 from django.contrib.auth.models import User
 from django.urls import reverse
+from tasks.middleware import SQL_INJECTION_MESSAGE, XSS_MESSAGE, SecurityMiddleware, scan_value
 from tasks.models import Task
 
 
@@ -109,3 +110,28 @@ class SecurityTest(TestCase):
             self.assertEqual(response.status_code, 302)
             self.assertIn('/login/', response.url)
 
+
+
+class SecurityMiddlewareTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = SecurityMiddleware(lambda request: None)
+
+    def post(self, **data):
+        return self.middleware.process_request(self.factory.post('/', data))
+
+    def test_plain_text_passes(self):
+        self.assertIsNone(self.post(title='Подготовить отчёт', description='Собрать данные из CRM'))
+
+    def test_sql_injection_is_rejected(self):
+        response = self.post(title='1 OR 1=1')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content.decode(), SQL_INJECTION_MESSAGE)
+
+    def test_sql_takes_precedence_over_xss(self):
+        self.assertEqual(scan_value('<iframe src=x> then drop table'), SQL_INJECTION_MESSAGE)
+        self.assertEqual(scan_value('<iframe src=x>'), XSS_MESSAGE)
+
+    def test_unicode_case_variants_are_detected(self):
+        self.assertEqual(scan_value('ſelect all'), SQL_INJECTION_MESSAGE)
+        self.assertEqual(scan_value('javaſcript:alert(1)'), XSS_MESSAGE)
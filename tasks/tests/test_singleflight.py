@@ -0,0 +1,147 @@
+import asyncio
+import threading
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from tasks.fragments import latest_update
+from tasks.models import Task
+from tasks.operations import new_task_document
+from tasks.routing import replica_reads
+from tasks.singleflight import SingleFlight, flight_key, single_flight
+
+
+class SingleFlightTest(SimpleTestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.flights = SingleFlight(window=0.3, clock=lambda: self.now)
+        self.release = threading.Event()
+        self.calls = 0
+
+    def slow_query(self):
+        self.calls += 1
+        self.release.wait(5)
+        return ['Подготовить отчёт']
+
+    def start_threads(self, key, count):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.flights.do(key, self.slow_query)))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def wait_for_followers(self, kind, count):
+        for _ in range(500):
+            if self.flights.stats()['kinds'].get(kind, {}).get('shared') == count:
+                return
+            threading.Event().wait(0.01)
+        self.fail('Ожидающие запросы не присоединились к рейсу')
+
+    def test_concurrent_threads_share_one_query(self):
+        threads, results = self.start_threads((1, 'autocomplete', False, 'отч'), 5)
+        self.wait_for_followers('autocomplete', 4)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [['Подготовить отчёт']] * 5)
+        stats = self.flights.stats()['kinds']['autocomplete']
+        self.assertEqual(stats['executed'], 1)
+        self.assertEqual(stats['saved'], 4)
+
+    def test_result_window_expires(self):
+        self.release.set()
+        key = (1, 'latest_update', False)
+        self.flights.do(key, self.slow_query)
+        self.flights.do(key, self.slow_query)
+        self.assertEqual(self.calls, 1)
+        
+        self.now = 0.5
+        self.flights.do(key, self.slow_query)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.flights.stats()['kinds']['latest_update']['window_hits'], 1)
+
+    def test_error_reaches_followers_and_is_not_kept(self):
+        def failing():
+            self.calls += 1
+            raise ValueError('нет соединения')
+        
+        with self.assertRaises(ValueError):
+            self.flights.do((1, 'stats', False), failing)
+        with self.assertRaises(ValueError):
+            self.flights.do((1, 'stats', False), failing)
+        self.assertEqual(self.calls, 2)
+
+    def test_forget_detaches_flight_started_before_write(self):
+        key = (1, 'board', False, 'digest')
+        threads, results = self.start_threads(key, 1)
+        self.wait_for_in_flight()
+        
+        self.flights.forget(1)
+        self.assertEqual(self.flights.stats()['in_flight'], 0)
+        self.release.set()
+        threads[0].join()
+        
+        self.flights.do(key, self.slow_query)
+        self.assertEqual(self.calls, 2)
+
+    def wait_for_in_flight(self):
+        for _ in range(500):
+            if self.flights.stats()['in_flight']:
+                return
+            threading.Event().wait(0.01)
+        self.fail('Запрос не начался')
+
+    def test_coroutines_share_one_query(self):
+        async def query():
+            self.calls += 1
+            await asyncio.sleep(0.05)
+            return ['Созвониться с клиентом']
+        
+        async def burst():
+            key = (1, 'autocomplete', False, 'соз')
+            return await asyncio.gather(*(self.flights.ado(key, query) for _ in range(5)))
+        
+        results = asyncio.run(burst())
+        
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [['Созвониться с клиентом']] * 5)
+
+    def test_coroutine_waits_for_thread_leader(self):
+        key = (1, 'stats', False)
+        threads, results = self.start_threads(key, 1)
+        self.wait_for_in_flight()
+        
+        async def follower():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, self.release.set)
+            return await self.flights.ado(key, self.fail)
+        
+        self.assertEqual(asyncio.run(follower()), ['Подготовить отчёт'])
+        threads[0].join()
+        self.assertEqual(self.calls, 1)
+
+    def test_replica_and_primary_reads_are_not_shared(self):
+        with replica_reads():
+            replica = flight_key(1, 'stats')
+        
+        self.assertNotEqual(replica, flight_key(1, 'stats'))
+
+
+class LatestUpdateWindowTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tabs', password='pass123')
+        Task.objects(user_id=self.user.id).delete()
+        single_flight.clear()
+
+    def test_window_hides_only_writes_from_other_processes(self):
+        self.assertIsNone(latest_update(self.user.id))
+        # Запись в обход приложения, как из другого процесса: сигнал не отправляется.
+        Task._get_collection().insert_one(new_task_document(self.user.id, {'title': 'Из другого процесса'}))
+        self.assertIsNone(latest_update(self.user.id))
+        
+        task = Task.objects.create(title='Новая задача', user_id=self.user.id)
+        self.assertEqual(latest_update(self.user.id), Task.objects.get(id=task.id).updated_at)
@@ -1,7 +1,11 @@
+import time
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
-from tasks.models import Task
+from django.utils.http import http_date
+from datetime import datetime
+from tasks.models import BoardVersion, Task
+from tasks.singleflight import single_flight
 
 
 class TaskViewsTest(TestCase):
@@ -116,3 +120,150 @@ class TaskViewsTest(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertEqual(len(Task.objects.filter(id=task_id)), 0)
 
+    def test_task_edit_post_ignores_foreign_task(self):
+        self.client.login(username='user1', password='pass123')
+        response = self.client.post(
+            reverse('task_edit', args=[self.task2.id]),
+            {'title': 'Hijacked', 'description': '', 'status': 'done', 'priority': '1', 'due_date': ''}
+        )
+        
+        self.assertRedirects(response, reverse('task_list'))
+        task = Task.objects.get(id=self.task2.id)
+        self.assertEqual(task.title, 'Task User 2')
+        self.assertEqual(task.status, 'in_progress')
+
+    def test_task_toggle_flips_completed_atomically(self):
+        self.client.login(username='user1', password='pass123')
+        url = reverse('task_toggle', args=[self.task1.id])
+        
+        self.client.get(url)
+        self.assertTrue(Task.objects.get(id=self.task1.id).completed)
+        self.client.get(url)
+        self.assertFalse(Task.objects.get(id=self.task1.id).completed)
+
+        response = self.client.get(reverse('task_toggle', args=['not-an-id']))
+        self.assertRedirects(response, reverse('task_list'))
+
+
+    def test_task_list_builds_columns_with_counts(self):
+        Task.objects(user_id=self.user1.id, id__ne=self.task1.id).delete()
+        Task(title='Done Task', user_id=self.user1.id, status='done').save()
+        self.client.login(username='user1', password='pass123')
+        response = self.client.get(reverse('task_list'))
+        
+        columns = {column['status']: column for column in response.context['columns']}
+        self.assertEqual(columns['todo']['count'], 1)
+        self.assertEqual(columns['in_progress']['count'], 0)
+        self.assertEqual(columns['done']['count'], 1)
+        self.assertEqual(response.context['total'], 2)
+        self.assertEqual(columns['done']['cards'][0]['title'], 'Done Task')
+
+    def test_task_column_paginates_with_cursor(self):
+        Task.objects(user_id=self.user1.id, id__ne=self.task1.id).delete()
+        for i in range(3):
+            Task(title=f'Paged Task {i}', user_id=self.user1.id, status='done').save()
+        self.client.login(username='user1', password='pass123')
+        
+        first = self.client.get(reverse('task_column'), {'status': 'done', 'limit': 2}).json()
+        self.assertEqual(first['html'].count('kanban-card-title'), 2)
+        self.assertIsNotNone(first['next_cursor'])
+        
+        second = self.client.get(
+            reverse('task_column'),
+            {'status': 'done', 'limit': 2, 'cursor': first['next_cursor']}
+        ).json()
+        self.assertEqual(second['html'].count('kanban-card-title'), 1)
+        self.assertIsNone(second['next_cursor'])
+        self.assertIn('Paged Task 0', second['html'])
+
+    def test_task_column_rejects_bad_cursor(self):
+        self.client.login(username='user1', password='pass123')
+        response = self.client.get(reverse('task_column'), {'status': 'todo', 'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_task_stats_counts_overdue_and_invalidates_on_write(self):
+        Task.objects(user_id=self.user1.id, id__ne=self.task1.id).delete()
+        Task(title='Overdue Task', user_id=self.user1.id, priority=2, due_date=datetime(2020, 1, 1)).save()
+        Task(title='Done Late', user_id=self.user1.id, status='done', completed=True, due_date=datetime(2020, 1, 1)).save()
+        self.client.login(username='user1', password='pass123')
+        
+        stats = self.client.get(reverse('task_stats')).json()
+        self.assertEqual(stats['total'], 3)
+        self.assertEqual(stats['by_status'], {'todo': 2, 'in_progress': 0, 'done': 1})
+        self.assertEqual(stats['matrix']['todo'], {'0': 0, '1': 1, '2': 1})
+        self.assertEqual(stats['overdue'], 1)
+        self.assertAlmostEqual(stats['completion_rate'], 1 / 3, places=3)
+        
+        self.client.post(reverse('task_delete', args=[self.task1.id]))
+        self.assertEqual(self.client.get(reverse('task_stats')).json()['total'], 2)
+
+    def test_toggled_task_is_not_overdue(self):
+        Task.objects(user_id=self.user1.id, id__ne=self.task1.id).delete()
+        late = Task(title='Toggled Late', user_id=self.user1.id, due_date=datetime(2020, 1, 1))
+        late.save()
+        self.client.login(username='user1', password='pass123')
+        self.assertEqual(self.client.get(reverse('task_stats')).json()['overdue'], 1)
+        
+        # Переключение меняет только completed: статус остаётся «todo», но задача выполнена.
+        self.client.post(reverse('task_toggle', args=[late.id]))
+        stats = self.client.get(reverse('task_stats')).json()
+        self.assertEqual(stats['by_status']['todo'], 2)
+        self.assertEqual(stats['overdue'], 0)
+
+    def test_task_list_revalidates_with_etag(self):
+        Task.objects(user_id=self.user1.id, id__ne=self.task1.id).delete()
+        self.client.login(username='user1', password='pass123')
+        first = self.client.get(reverse('task_list'))
+        etag = first['ETag']
+        self.assertIn('private', first['Cache-Control'])
+        
+        cached = self.client.get(reverse('task_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        
+        self.client.post(reverse('task_delete', args=[self.task1.id]))
+        changed = self.client.get(reverse('task_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertContains(changed, 'Задача успешно удалена!')
+        self.assertNotContains(changed, 'Task User 1')
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_delete_in_another_process_changes_etag(self):
+        Task.objects(user_id=self.user1.id, id__ne=self.task1.id).delete()
+        self.client.login(username='user1', password='pass123')
+        etag = self.client.get(reverse('task_list'))['ETag']
+        
+        # Другой процесс (archive_tasks, второй воркер): удаление без сигнала в этом процессе.
+        Task._get_collection().delete_one({'_id': self.task1.id})
+        BoardVersion._get_collection().update_one({'_id': self.user1.id}, {'$inc': {'version': 1}}, upsert=True)
+        single_flight.clear()
+        
+        changed = self.client.get(reverse('task_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotContains(changed, 'Task User 1')
+
+    def test_task_list_ignores_if_modified_since(self):
+        Task.objects(user_id=self.user1.id, id__ne=self.task1.id).delete()
+        self.client.login(username='user1', password='pass123')
+        first = self.client.get(reverse('task_list'))
+        self.assertNotIn('Last-Modified', first)
+        
+        # Удаление не двигает updated_at вперёд: доска обязана отдаться заново.
+        Task._get_collection().delete_one({'_id': self.task1.id})
+        BoardVersion._get_collection().update_one({'_id': self.user1.id}, {'$inc': {'version': 1}}, upsert=True)
+        single_flight.clear()
+        
+        changed = self.client.get(reverse('task_list'), HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 86400))
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotContains(changed, 'Task User 1')
+
+    def test_task_cards_use_precomputed_view_model(self):
+        Task.objects(user_id=self.user1.id, id__ne=self.task1.id).delete()
+        self.client.login(username='user1', password='pass123')
+        response = self.client.get(reverse('task_list'))
+        
+        card = response.context['columns'][0]['cards'][0]
+        self.assertEqual(card['edit_url'], reverse('task_edit', args=[self.task1.id]))
+        self.assertEqual(card['delete_url'], reverse('task_delete', args=[self.task1.id]))
+        self.assertEqual((card['priority_class'], card['priority_label']), ('priority-medium', 'СРЕДНИЙ'))
+        self.assertContains(response, 'class="kanban-card priority-medium"')
+        self.assertContains(response, 'tasks/css/board.css')
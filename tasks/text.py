@@ -0,0 +1,42 @@
+import re
+
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Префиксы с первой буквы: запрос из одного символа (первое нажатие клавиши)
+# находит задачи так же, как находил title__icontains.
+MIN_PREFIX = 1
+MAX_PREFIX = 20
+
+
+def normalize(text):
+    # casefold() корректно сворачивает регистр кириллицы; «ё» ищется как «е».
+    return (text or '').casefold().replace('ё', 'е')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize(text))
+
+
+def prefixes(token):
+    return [token[:length] for length in range(MIN_PREFIX, min(len(token), MAX_PREFIX) + 1)]
+
+
+def index_terms(title, description=None):
+    # Для названия индексируются все префиксы слов (поиск по мере ввода),
+    # для описания только слова целиком, чтобы не раздувать индекс.
+    terms = set()
+    for token in tokenize(title):
+        terms.update(prefixes(token))
+    for token in tokenize(description):
+        terms.add(token[:MAX_PREFIX])
+    return sorted(terms)
+
+
+def query_terms(query):
+    terms = []
+    for token in tokenize(query):
+        term = token[:MAX_PREFIX]
+        if term not in terms:
+            terms.append(term)
+    return terms
@@ -10,6 +10,13 @@ urlpatterns = [
     path('task/<str:task_id>/edit/', views.task_edit, name='task_edit'),
     path('task/<str:task_id>/delete/', views.task_delete, name='task_delete'),
     path('task/<str:task_id>/toggle/', views.task_toggle, name='task_toggle'),
+    path('task/import/', views.task_import, name='task_import'),
     path('api/task-autocomplete/', views.task_autocomplete, name='task_autocomplete'),
+    path('api/task-column/', views.task_column, name='task_column'),
+    path('api/task-stats/', views.task_stats, name='task_stats'),
+    path('api/tasks/events/', views.task_events, name='task_events'),
+    path('api/tasks/bulk/', views.task_bulk, name='task_bulk'),
+    path('api/tasks/export/', views.task_export, name='task_export'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
 
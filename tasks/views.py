@@ -3,13 +3,34 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.views.decorators.cache import never_cache
+from django.views.decorators.cache import cache_control, never_cache
 from django.views.decorators.csrf import csrf_protect
 from django.utils.html import escape
-from django.http import Http404, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.core.handlers.asgi import ASGIRequest
 from .models import Task
 from .forms import TaskForm
+from .operations import MAX_BULK_OPERATIONS, bulk_apply, delete_task, toggle_task, update_task
+from .decorators import task_owner_required
+from .routing import allow_replica_reads
+from .autocomplete import autocomplete_cache
+from .export import EXPORT_FORMATS, aiter_chunks, export_documents, iter_export, iter_gzip
+from .importer import IMPORT_FORMATS, detect_format, import_tasks, iter_rows
+from .stats import aboard_stats, board_stats
+from .fragments import board_state, render_board
+from .live import WSGI_STREAMS, aiter_events, board_events, iter_events
+from . import metrics
+from .board import (
+    BOARD_COLUMNS, MAX_PAGE_SIZE, PAGE_SIZE, InvalidCursor,
+    acolumn_page, archive_queryset, board_queryset,
+)
 from datetime import datetime
+import asyncio
+import json
 
 
 @csrf_protect
@@ -64,32 +85,40 @@ def user_logout(request):
     return redirect('login')
 
 
+def live_updates_enabled(request):
+    return isinstance(request, ASGIRequest) or WSGI_STREAMS
+
+
 @login_required
-@never_cache
+@allow_replica_reads
+@cache_control(private=True, no_cache=True)
 def task_list(request):
     search_query = request.GET.get('search', '').strip()
     status_filter = request.GET.get('status', '')
     priority_filter = request.GET.get('priority', '')
     
-    tasks = Task.objects(user_id=request.user.id)
-    
-    if search_query:
-        tasks = tasks.filter(title__icontains=search_query)
-    
-    if status_filter:
-        tasks = tasks.filter(status=status_filter)
+    stats = board_stats(request.user.id)
+    digest = board_state(
+        request.user.id, search_query, status_filter, priority_filter, stats['overdue']
+    )
+    etag = quote_etag(digest)
     
-    if priority_filter:
-        tasks = tasks.filter(priority=int(priority_filter))
+    # Сообщения показываются один раз, поэтому страницу с ними не отдаём как 304.
+    if not len(messages.get_messages(request)):
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
     
-    tasks = tasks.order_by('-created_at')
-    
-    return render(request, 'tasks/task_list.html', {
-        'tasks': tasks,
+    response = render(request, 'tasks/task_list.html', {
+        'board_html': render_board(request, digest, search_query, status_filter, priority_filter),
+        'stats': stats,
         'search_query': search_query,
         'status_filter': status_filter,
-        'priority_filter': priority_filter
+        'priority_filter': priority_filter,
+        'live_updates': live_updates_enabled(request),
     })
+    response['ETag'] = etag
+    return response
 
 
 @login_required
@@ -118,29 +147,15 @@ def task_create(request):
 
 @login_required
 @csrf_protect
-def task_edit(request, task_id):
-    try:
-        task = Task.objects.get(id=task_id)
-    except Task.DoesNotExist:
-        messages.error(request, 'Задача не найдена.')
-        return redirect('task_list')
-    
-    if task.user_id != request.user.id:
-        messages.error(request, 'У вас нет прав для редактирования этой задачи.')
-        return redirect('task_list')
-    
+@task_owner_required(methods=('GET',))
+def task_edit(request, task_id, task=None):
     if request.method == 'POST':
         form = TaskForm(request.POST)
         if form.is_valid():
-            status = form.cleaned_data['status']
-            task.title = form.cleaned_data['title']
-            task.description = form.cleaned_data['description']
-            task.status = status
-            task.priority = int(form.cleaned_data['priority'])
-            task.completed = status == 'done'
-            task.due_date = form.cleaned_data['due_date']
-            task.save()
-            messages.success(request, 'Задача успешно обновлена!')
+            if update_task(task_id, request.user.id, form.cleaned_data):
+                messages.success(request, 'Задача успешно обновлена!')
+            else:
+                messages.error(request, 'Задача не найдена.')
             return redirect('task_list')
     else:
         initial_data = {
@@ -158,20 +173,13 @@ def task_edit(request, task_id):
 
 @login_required
 @csrf_protect
-def task_delete(request, task_id):
-    try:
-        task = Task.objects.get(id=task_id)
-    except Task.DoesNotExist:
-        messages.error(request, 'Задача не найдена.')
-        return redirect('task_list')
-    
-    if task.user_id != request.user.id:
-        messages.error(request, 'У вас нет прав для удаления этой задачи.')
-        return redirect('task_list')
-    
+@task_owner_required(methods=('GET',), fields=('title',))
+def task_delete(request, task_id, task=None):
     if request.method == 'POST':
-        task.delete()
-        messages.success(request, 'Задача успешно удалена!')
+        if delete_task(task_id, request.user.id):
+            messages.success(request, 'Задача успешно удалена!')
+        else:
+            messages.error(request, 'Задача не найдена.')
         return redirect('task_list')
     
     return render(request, 'tasks/task_confirm_delete.html', {'task': task})
@@ -180,35 +188,175 @@ def task_delete(request, task_id):
 @login_required
 @csrf_protect
 def task_toggle(request, task_id):
-    try:
-        task = Task.objects.get(id=task_id)
-    except Task.DoesNotExist:
+    if toggle_task(task_id, request.user.id) is None:
         messages.error(request, 'Задача не найдена.')
-        return redirect('task_list')
-    
-    if task.user_id != request.user.id:
-        messages.error(request, 'У вас нет прав для изменения этой задачи.')
-        return redirect('task_list')
-    
-    task.completed = not task.completed
-    task.save()
-    messages.success(request, 'Статус задачи изменен!')
+    else:
+        messages.success(request, 'Статус задачи изменен!')
     return redirect('task_list')
 
 
 @login_required
-def task_autocomplete(request):
+@allow_replica_reads
+async def task_autocomplete(request):
     query = request.GET.get('q', '').strip()
     
     if len(query) < 2:
         return JsonResponse({'suggestions': []})
     
-    tasks = Task.objects(
-        user_id=request.user.id,
-        title__icontains=query
-    ).only('title').limit(10)
-    
-    suggestions = [task.title for task in tasks]
+    user = await request.auser()
+    suggestions = await autocomplete_cache.asuggest(user.id, query)
     
     return JsonResponse({'suggestions': suggestions})
 
+
+@login_required
+@allow_replica_reads
+async def task_column(request):
+    status = request.GET.get('status', '')
+    cursor = request.GET.get('cursor', '')
+    
+    if status not in dict(BOARD_COLUMNS):
+        return JsonResponse({'error': 'Неизвестный статус.'}, status=400)
+    
+    try:
+        limit = min(int(request.GET.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        limit = PAGE_SIZE
+    
+    user = await request.auser()
+    search_query = request.GET.get('search', '').strip()
+    priority_filter = request.GET.get('priority', '')
+    tasks = board_queryset(user.id, search_query, priority_filter)
+    archived = archive_queryset(user.id, search_query, priority_filter)
+    
+    try:
+        cards, next_cursor = await acolumn_page(tasks, status, cursor or None, max(limit, 1), archived)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Некорректный курсор.'}, status=400)
+    
+    html = render_to_string('tasks/_task_card_list.html', {'cards': cards})
+    
+    return JsonResponse({'html': html, 'next_cursor': next_cursor})
+
+
+@login_required
+@allow_replica_reads
+@never_cache
+async def task_stats(request):
+    user = await request.auser()
+    return JsonResponse(await aboard_stats(user.id))
+
+
+@login_required
+async def task_events(request):
+    user = await request.auser()
+    filters = (
+        request.GET.get('search', '').strip(),
+        request.GET.get('status', ''),
+        request.GET.get('priority', ''),
+    )
+    if not live_updates_enabled(request):
+        # 204 останавливает переподключения EventSource из уже открытых вкладок.
+        return HttpResponse(status=204)
+    
+    # После переподключения пропущенные события заменяет одна перезагрузка доски.
+    resync = 'Last-Event-ID' in request.headers
+    
+    if isinstance(request, ASGIRequest):
+        subscription = board_events.subscribe(user.id, *filters, loop=asyncio.get_running_loop())
+        stream = aiter_events(subscription, board_events, resync)
+    else:
+        # Под WSGI (WSGI_STREAMS) каждое подключение занимает рабочий поток.
+        subscription = board_events.subscribe(user.id, *filters)
+        stream = iter_events(subscription, board_events, resync)
+    
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+@csrf_protect
+def task_bulk(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Метод не поддерживается.'}, status=405)
+    
+    try:
+        payload = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': 'Некорректный JSON.'}, status=400)
+    
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return JsonResponse({'error': 'Ожидается непустой список operations.'}, status=400)
+    
+    if len(operations) > MAX_BULK_OPERATIONS:
+        return JsonResponse(
+            {'error': f'Не более {MAX_BULK_OPERATIONS} операций за запрос.'},
+            status=400
+        )
+    
+    results, summary = bulk_apply(request.user.id, operations)
+    
+    return JsonResponse({'results': results, 'summary': summary})
+
+
+@login_required
+@never_cache
+def task_export(request):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': 'Неизвестный формат выгрузки.'}, status=400)
+    
+    docs = export_documents(
+        request.user.id,
+        request.GET.get('search', '').strip(),
+        request.GET.get('priority', ''),
+        include_archived=request.GET.get('archived') != '0'
+    )
+    content = iter_export(docs, export_format)
+    filename = f'tasks.{export_format}'
+    content_type = EXPORT_FORMATS[export_format]
+    if request.GET.get('gzip') == '1':
+        content = iter_gzip(content)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    if isinstance(request, ASGIRequest):
+        content = aiter_chunks(content)
+    
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@csrf_protect
+def task_import(request):
+    report = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        import_format = request.POST.get('format') or None
+        if upload is None:
+            messages.error(request, 'Выберите файл для импорта.')
+        elif import_format is not None and import_format not in IMPORT_FORMATS:
+            messages.error(request, 'Неизвестный формат файла.')
+        else:
+            rows = iter_rows(upload, import_format or detect_format(upload.name))
+            report = import_tasks(request.user.id, rows)
+            if report.inserted:
+                messages.success(request, f'Импортировано задач: {report.inserted}.')
+    
+    return render(request, 'tasks/task_import.html', {'report': report, 'formats': IMPORT_FORMATS})
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorized = request.user.is_authenticated and request.user.is_staff
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        authorized = True
+    
+    if not authorized:
+        raise Http404
+    
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4')